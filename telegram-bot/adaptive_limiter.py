@@ -0,0 +1,258 @@
+import os
+import time
+import heapq
+import asyncio
+import sqlite3
+import logging
+import itertools
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Shared by every process on the host that uses the same file (bot and API server); by default
+# next to this module, so both share it whatever directory they were started from
+LIMITER_STATE_PATH = os.getenv(
+    "LIMITER_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "limiters.sqlite3")
+)
+# Upper bounds per minute; the actual rate adapts below these on 429/quota errors
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "100"))
+SEARCH_RPM = float(os.getenv("SEARCH_RPM", "50"))
+# Longest an interactive request waits for a slot before giving up (background: BACKGROUND_MAX_WAIT)
+LIMITER_MAX_WAIT = float(os.getenv("LIMITER_MAX_WAIT", "30"))
+BACKGROUND_MAX_WAIT = float(os.getenv("BACKGROUND_MAX_WAIT", "5"))
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_DECREASE = 0.5  # multiplicative decrease on throttling
+_INCREASE = 0.05  # additive increase per success, as a fraction of the maximum rate
+_MIN_FRACTION = 0.05  # the rate never drops below this fraction of the maximum
+_DECREASE_INTERVAL = 1.0  # throttles within this (or the Retry-After pause) count as one burst: one decrease
+_STORE_TIMEOUT = 0.02  # seconds the event loop may wait on another process's lock before using local state
+_FEEDBACK_INTERVAL = 1.0  # successes are written with the next token taken, or after this many seconds
+
+
+class DeadlineExceeded(Exception):
+    """The request could not get a slot before its deadline; raised early instead of waiting it out."""
+
+
+class AdaptiveLimiter:
+    """AIMD token bucket for an upstream API, shared across processes through SQLite.
+
+    The rate starts at max_per_minute, halves whenever the upstream throttles (429 or a
+    quota error), honouring any Retry-After by pausing all callers, and creeps back up
+    with every success. A burst of throttled calls halves it once, not once per call.
+    Waiting callers are served interactive first, then background; a caller whose
+    expected wait already overshoots its deadline fails straight away.
+
+    The state is read and written on the event loop, so the database lock is only waited
+    on briefly. While another process holds it, this process carries on from its own copy
+    of the last state it saw. Successes are counted in memory and written along with the
+    next token taken rather than in a transaction of their own.
+
+    `async with limiter:` takes an interactive slot; limiter.slot(BACKGROUND) and
+    limiter.slot(max_wait=...) give other priorities and deadlines.
+    """
+
+    def __init__(self, name: str, max_per_minute: float, burst: float = None, path: str = LIMITER_STATE_PATH):
+        self.name = name
+        self.max_rate = max_per_minute / 60.0
+        self.min_rate = self.max_rate * _MIN_FRACTION
+        self.burst = burst if burst is not None else max(1.0, max_per_minute / 10.0)
+        self.waiters = []  # heap of (priority, sequence)
+        self.sequence = itertools.count()
+        self.changed = asyncio.Condition()
+
+        self.granted = 0
+        self.throttled = 0
+        self.gave_up = 0
+        self.store_busy = 0
+        self.local = (self.max_rate, self.burst, time.time(), 0.0)  # rate, tokens, updated, blocked_until
+        self.successes = 0  # not yet applied to the shared rate
+        self.last_write = time.monotonic()
+        self.decrease_hold_until = 0.0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=1.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS limiters ("
+            "name TEXT PRIMARY KEY, rate REAL NOT NULL, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL, blocked_until REAL NOT NULL)"
+        )
+        self.db.execute(
+            "INSERT OR IGNORE INTO limiters VALUES (?, ?, ?, ?, 0)",
+            (name, self.max_rate, self.burst, time.time()),
+        )
+        self.local = tuple(self.db.execute(
+            "SELECT rate, tokens, updated, blocked_until FROM limiters WHERE name = ?", (name,)
+        ).fetchone())
+        # Setup may wait for the lock; after that, never block the loop for long
+        self.db.execute(f"PRAGMA busy_timeout = {int(_STORE_TIMEOUT * 1000)}")
+
+    def _advance(self, change, successes, rate, tokens, updated, blocked_until):
+        now = time.time()
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * rate)
+        rate = min(self.max_rate, rate + self.max_rate * _INCREASE * successes)
+        rate, tokens, blocked_until, result = change(rate, tokens, blocked_until, now)
+        return (rate, tokens, now, blocked_until), result
+
+    def _update(self, change):
+        """Runs change(rate, tokens, blocked_until, now) -> (rate, tokens, blocked_until, result) atomically.
+
+        Pending successes are applied first. Falls back to this process's copy of the state
+        when the database is locked or failing.
+        """
+        successes = self.successes
+        self.successes = 0
+        self.last_write = time.monotonic()
+        try:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute(
+                    "SELECT rate, tokens, updated, blocked_until FROM limiters WHERE name = ?", (self.name,)
+                ).fetchone()
+                state, result = self._advance(change, successes, *row)
+                self.db.execute(
+                    "UPDATE limiters SET rate = ?, tokens = ?, updated = ?, blocked_until = ? WHERE name = ?",
+                    (state[0], state[1], state[2], state[3], self.name),
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                if self.db.in_transaction:
+                    self.db.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError as e:
+            self.store_busy += 1
+            if self.store_busy == 1:
+                logger.warning(f"{self.name} limiter state unavailable ({e}); using this process's copy meanwhile")
+            self.local, result = self._advance(change, successes, *self.local)
+            return result
+        self.local = state
+        return result
+
+    def _take(self) -> float:
+        """Takes a token if one is available; returns 0, or the seconds until one will be."""
+        def take(rate, tokens, blocked_until, now):
+            if now < blocked_until:
+                return rate, tokens, blocked_until, blocked_until - now
+            if tokens >= 1.0:
+                return rate, tokens - 1.0, blocked_until, 0.0
+            return rate, tokens, blocked_until, (1.0 - tokens) / rate
+        return self._update(take)
+
+    def on_success(self):
+        self.successes += 1
+        if time.monotonic() - self.last_write >= _FEEDBACK_INTERVAL:
+            self._update(lambda rate, tokens, blocked_until, now: (rate, tokens, blocked_until, None))
+
+    def on_throttle(self, retry_after: float = None):
+        """Upstream said slow down: halve the rate and, given Retry-After, pause until then.
+
+        Calls that were already in flight come back throttled too; the rate is halved once
+        per _DECREASE_INTERVAL (or Retry-After pause), not once per throttled call.
+        """
+        self.throttled += 1
+        now = time.time()
+        halve = now >= self.decrease_hold_until
+        if halve:
+            self.decrease_hold_until = now + max(_DECREASE_INTERVAL, retry_after or 0.0)
+
+        def decrease(rate, tokens, blocked_until, now):
+            if halve:
+                rate = max(self.min_rate, rate * _DECREASE)
+            if retry_after:
+                blocked_until = max(blocked_until, now + retry_after)
+            return rate, min(tokens, 0.0), blocked_until, rate
+        rate = self._update(decrease)
+        if halve:
+            logger.warning(f"{self.name} throttled upstream; rate now {rate * 60:.1f}/min"
+                           + (f", paused {retry_after:.1f}s" if retry_after else ""))
+
+    def _rank(self, ticket: tuple) -> int:
+        return sum(1 for waiter in self.waiters if waiter < ticket)
+
+    async def acquire(self, priority: int = INTERACTIVE, max_wait: float = LIMITER_MAX_WAIT):
+        started = time.monotonic()
+        deadline = started + max_wait
+        ticket = (priority, next(self.sequence))
+        async with self.changed:
+            heapq.heappush(self.waiters, ticket)
+            try:
+                while True:
+                    if self.waiters[0] == ticket:
+                        wait = self._take()
+                        if wait <= 0:
+                            heapq.heappop(self.waiters)
+                            self.granted += 1
+                            metrics.observe("limiter_wait_seconds", time.monotonic() - started, limiter=self.name)
+                            return
+                        expected = wait
+                    else:
+                        # Rough: everyone ahead needs a token at the current rate
+                        wait = None
+                        expected = (self._rank(ticket) + 1) / self.current_rate()
+                    if time.monotonic() + expected > deadline:
+                        self.gave_up += 1
+                        raise DeadlineExceeded(
+                            f"{self.name}: no slot within {max_wait:.0f}s (expected wait {expected:.1f}s)"
+                        )
+                    try:
+                        await asyncio.wait_for(self.changed.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                if ticket in self.waiters:
+                    self.waiters.remove(ticket)
+                    heapq.heapify(self.waiters)
+                # The next waiter in line may be able to go now
+                self.changed.notify_all()
+
+    def current_rate(self) -> float:
+        """The rate as of this process's last read or write of the shared state."""
+        return self.local[0]
+
+    def slot(self, priority: int = INTERACTIVE, max_wait: float = None) -> "LimiterSlot":
+        if max_wait is None:
+            max_wait = BACKGROUND_MAX_WAIT if priority == BACKGROUND else LIMITER_MAX_WAIT
+        return LimiterSlot(self, priority, max_wait)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_minute": round(self.current_rate() * 60, 1),
+            "max_per_minute": round(self.max_rate * 60, 1),
+            "waiting": len(self.waiters),
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "gave_up": self.gave_up,
+            "store_busy": self.store_busy,
+        }
+
+
+class LimiterSlot:
+    """A limiter with a fixed priority and deadline; feedback goes to the shared limiter."""
+
+    def __init__(self, limiter: AdaptiveLimiter, priority: int, max_wait: float):
+        self.limiter = limiter
+        self.priority = priority
+        self.max_wait = max_wait
+
+    async def __aenter__(self):
+        await self.limiter.acquire(self.priority, self.max_wait)
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def on_success(self):
+        self.limiter.on_success()
+
+    def on_throttle(self, retry_after: float = None):
+        self.limiter.on_throttle(retry_after)
@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_WORKERS = int(os.getenv("ADMISSION_WORKERS", "8"))  # pipelines running at once, all users
+ADMISSION_PER_USER = int(os.getenv("ADMISSION_PER_USER", "1"))  # pipelines running at once, per user
+ADMISSION_QUEUE_MAX = int(os.getenv("ADMISSION_QUEUE_MAX", "100"))  # queued requests before new ones are shed
+ADMISSION_USER_QUEUE_MAX = int(os.getenv("ADMISSION_USER_QUEUE_MAX", "10"))  # queued requests per user
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing when the global or the user's queue is full."""
+
+    def __init__(self, message: str, per_user: bool = False):
+        super().__init__(message)
+        self.per_user = per_user
+
+
+class AdmissionController:
+    """Fair admission for bot work: bounded concurrency, per-user caps, round-robin across users.
+
+    Every user has a FIFO of waiting requests; free worker slots are handed out by cycling
+    through users with waiting work, so one user's burst of 50 claims queues behind itself
+    instead of in front of everyone else. Requests beyond the queue limits are rejected
+    (Overloaded) rather than queued, which keeps waiting time bounded.
+    """
+
+    def __init__(self, workers: int = ADMISSION_WORKERS, per_user: int = ADMISSION_PER_USER,
+                 queue_max: int = ADMISSION_QUEUE_MAX, user_queue_max: int = ADMISSION_USER_QUEUE_MAX):
+        self.workers = workers
+        self.per_user = per_user
+        self.queue_max = queue_max
+        self.user_queue_max = user_queue_max
+        self.queues = {}  # user -> deque of waiting futures
+        self.ring = deque()  # users with waiting requests, in round-robin order
+        self.running = {}  # user -> requests running
+        self.total_running = 0
+        self.total_queued = 0
+
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.max_depth = 0
+        self.wait_seconds = 0.0
+
+    def _can_start(self, user) -> bool:
+        return self.total_running < self.workers and self.running.get(user, 0) < self.per_user
+
+    def _start(self, user):
+        self.total_running += 1
+        self.running[user] = self.running.get(user, 0) + 1
+        self.admitted += 1
+
+    def _release(self, user):
+        self.total_running -= 1
+        self.running[user] -= 1
+        if not self.running[user]:
+            del self.running[user]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hands free slots to waiting requests, one user at a time in ring order."""
+        skipped = 0
+        while self.ring and self.total_running < self.workers and skipped < len(self.ring):
+            user = self.ring.popleft()
+            queue = self.queues[user]
+            if self.running.get(user, 0) >= self.per_user:
+                # At its cap; it gets another turn once one of its requests finishes
+                self.ring.append(user)
+                skipped += 1
+                continue
+            skipped = 0
+            waiter = queue.popleft()
+            self.total_queued -= 1
+            if not waiter.done():  # a cancelled waiter is dropped and withdraws itself
+                self._start(user)
+                waiter.set_result(None)
+            if queue:
+                self.ring.append(user)
+            else:
+                del self.queues[user]
+
+    def position(self, user, waiter) -> int:
+        """Approximate place in line: round-robin serves up to this many requests before this one."""
+        index = self.queues[user].index(waiter)
+        return sum(min(len(queue), index + 1) for queue in self.queues.values())
+
+    def _enqueue(self, user) -> asyncio.Future:
+        if self.total_queued >= self.queue_max:
+            self.shed += 1
+            raise Overloaded(f"{self.total_queued} requests already waiting")
+        queue = self.queues.get(user)
+        if queue is not None and len(queue) >= self.user_queue_max:
+            self.shed += 1
+            raise Overloaded(f"{len(queue)} of this user's requests already waiting", per_user=True)
+
+        if queue is None:
+            queue = self.queues[user] = deque()
+            self.ring.append(user)
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self.total_queued += 1
+        self.queued += 1
+        self.max_depth = max(self.max_depth, self.total_queued)
+        return waiter
+
+    def _withdraw(self, user, waiter):
+        queue = self.queues.get(user)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.total_queued -= 1
+        if not queue:
+            del self.queues[user]
+            self.ring.remove(user)
+
+    async def run(self, user, factory, on_queued=None):
+        """Runs factory() once admitted. on_queued(position) is awaited if the request has to wait.
+
+        Raises Overloaded without running anything when the request is shed.
+        """
+        # Requests only wait while every slot is taken (or the user is at their cap), and a
+        # user with requests already waiting goes behind them
+        if user not in self.queues and self._can_start(user):
+            self._start(user)
+        else:
+            waiter = self._enqueue(user)
+            queued_at = time.monotonic()
+            try:
+                if on_queued is not None:
+                    try:
+                        await on_queued(self.position(user, waiter))
+                    except Exception as e:
+                        logger.warning(f"Could not report queue position to {user}: {e}")
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release(user)  # admitted just as the caller went away
+                else:
+                    self._withdraw(user, waiter)
+                raise
+            self.wait_seconds += time.monotonic() - queued_at
+
+        try:
+            return await factory()
+        finally:
+            self._release(user)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.total_running,
+            "queued_now": self.total_queued,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "max_queue_depth": self.max_depth,
+            "avg_wait_seconds": round(self.wait_seconds / self.queued, 3) if self.queued else 0.0,
+        }
@@ -0,0 +1,306 @@
+"""Batch fact-checking: a file of claims in, one JSONL verdict per claim out.
+
+    python batch.py claims.csv --output verdicts.jsonl
+
+Running the same command again after an interruption resumes: claims already in the
+output file are skipped. POST /api/analyze/batch runs the same pipeline over HTTP.
+"""
+import os
+import re
+import io
+import sys
+import csv
+import json
+import time
+import asyncio
+import logging
+import argparse
+import contextlib
+from verdict_cache import normalize_claim
+from metrics import new_trace
+
+logger = logging.getLogger(__name__)
+
+BATCH_SEARCH_WORKERS = int(os.getenv("BATCH_SEARCH_WORKERS", "4"))  # claims searched and scraped at once
+BATCH_ANALYZE_WORKERS = int(os.getenv("BATCH_ANALYZE_WORKERS", "4"))  # claims analyzed by Gemini at once
+# API batches run with a batch_id
+BATCH_CHECKPOINT_DIR = os.getenv(
+    "BATCH_CHECKPOINT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "batches")
+)
+
+_BATCH_ID = re.compile(r"[\w-]{1,64}")
+_CLAIM_FIELDS = ("claim", "text", "headline")
+
+
+def parse_claims(text: str, fmt: str = None) -> list:
+    """(id, claim) pairs from JSONL or CSV text; fmt is "jsonl", "csv" or None to guess.
+
+    JSONL lines are objects with a "claim" (or "text"/"headline") and optional "id", or
+    bare JSON strings. CSV uses its "claim" and "id" columns when it has a header naming
+    them, else the first column. Claims without an id are numbered from 1 in file order.
+    """
+    if fmt is None:
+        fmt = "jsonl" if text.lstrip()[:1] in ("{", '"') else "csv"
+    claims = []
+    if fmt == "jsonl":
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping line {number}: not valid JSON")
+                continue
+            if isinstance(item, str):
+                item = {"claim": item}
+            claim = next((item[key] for key in _CLAIM_FIELDS if isinstance(item, dict) and item.get(key)), None)
+            if claim is None:
+                logger.warning(f"Skipping line {number}: no claim")
+                continue
+            claims.append((str(item.get("id", len(claims) + 1)), str(claim).strip()))
+        return claims
+
+    rows = list(csv.reader(io.StringIO(text)))
+    header = [cell.strip().lower() for cell in rows[0]] if rows else []
+    named = next((key for key in _CLAIM_FIELDS if key in header), None)
+    if named is not None:
+        claim_column, id_column = header.index(named), header.index("id") if "id" in header else None
+        rows = rows[1:]
+    else:
+        claim_column, id_column = 0, None
+    for row in rows:
+        if len(row) <= claim_column or not row[claim_column].strip():
+            continue
+        claim_id = row[id_column] if id_column is not None and len(row) > id_column else len(claims) + 1
+        claims.append((str(claim_id), row[claim_column].strip()))
+    return claims
+
+
+class BatchCheckpoint:
+    """Append-only JSONL of finished claims; a rerun skips every id already in it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.broken_tail = False
+
+    @classmethod
+    def for_batch(cls, batch_id: str, directory: str = BATCH_CHECKPOINT_DIR) -> "BatchCheckpoint":
+        if not _BATCH_ID.fullmatch(batch_id):
+            raise ValueError("batch_id may only contain letters, digits, '-' and '_' (at most 64)")
+        return cls(os.path.join(directory, f"{batch_id}.jsonl"))
+
+    def load(self) -> dict:
+        """id -> record for every claim finished by an earlier run."""
+        finished = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return finished
+        # A run killed mid-write leaves a partial last line; the next append starts a new one
+        self.broken_tail = bool(content) and not content.endswith("\n")
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "id" in record:
+                finished[str(record["id"])] = record
+        return finished
+
+    def append(self, record: dict):
+        if self.file is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+            if self.broken_tail:
+                self.file.write("\n")
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+async def run_batch(claims: list, search, analyze, cache=None, checkpoint: BatchCheckpoint = None,
+                    replay: bool = False, search_workers: int = BATCH_SEARCH_WORKERS,
+                    analyze_workers: int = BATCH_ANALYZE_WORKERS):
+    """Fact-checks (id, claim) pairs; yields a record per claim as it finishes, then a summary.
+
+    search(claim) -> documents and analyze(claim, documents) -> Verdict run as two stages,
+    each with its own pool of workers, so searching and scraping the next claims overlaps
+    with Gemini analysing earlier ones. Claims that normalize to the same text are checked
+    once. Searches and page downloads shared between claims are deduplicated by the search
+    client and scraper caches. Successful records go to the checkpoint; with replay, those
+    of an earlier run are yielded first, otherwise they are only counted.
+    """
+    started = time.perf_counter()
+    finished = checkpoint.load() if checkpoint is not None else {}
+    summary = {"claims": len(claims), "resumed": 0, "unique": 0, "cached": 0, "errors": 0}
+
+    groups = {}
+    for claim_id, claim in claims:
+        if claim_id in finished:
+            summary["resumed"] += 1
+            if replay:
+                yield finished[claim_id]
+            continue
+        groups.setdefault(normalize_claim(claim), []).append((claim_id, claim))
+    summary["unique"] = len(groups)
+
+    pending = asyncio.Queue()
+    for group in groups.values():
+        pending.put_nowait(group)
+    # Bounded, so searching can't run far ahead of analysis and pile up scraped pages
+    searched = asyncio.Queue(maxsize=analyze_workers * 2)
+    results = asyncio.Queue()
+
+    async def search_worker():
+        while not pending.empty():
+            group = pending.get_nowait()
+            claim = group[0][1]
+            claim_started = time.perf_counter()
+            trace_id = new_trace()
+            try:
+                cached = cache.get(claim) if cache is not None else None
+                if cached:
+                    results.put_nowait((group, cached, True, None, claim_started))
+                    continue
+                documents = await search(claim)
+            except Exception as e:
+                results.put_nowait((group, None, False, e, claim_started))
+                continue
+            await searched.put((group, documents, claim_started, trace_id))
+
+    async def analyze_worker():
+        while (item := await searched.get()) is not None:
+            group, documents, claim_started, trace_id = item
+            new_trace(trace_id)
+            claim = group[0][1]
+            try:
+                verdict = await analyze(claim, documents)
+                # Only cache verdicts that were backed by sources
+                if cache is not None and verdict.sources:
+                    cache.put(claim, verdict, time.perf_counter() - claim_started)
+                results.put_nowait((group, verdict, False, None, claim_started))
+            except Exception as e:
+                results.put_nowait((group, None, False, e, claim_started))
+
+    async def run_stages():
+        analyzers = [asyncio.create_task(analyze_worker()) for _ in range(max(1, analyze_workers))]
+        try:
+            await asyncio.gather(*(search_worker() for _ in range(max(1, search_workers))))
+            for _ in analyzers:
+                await searched.put(None)
+            await asyncio.gather(*analyzers)
+        finally:
+            for task in analyzers:
+                task.cancel()
+            results.put_nowait(None)
+
+    stages = asyncio.create_task(run_stages())
+    try:
+        while (item := await results.get()) is not None:
+            group, verdict, cached, error, claim_started = item
+            seconds = round(time.perf_counter() - claim_started, 2)
+            if error is not None:
+                summary["errors"] += len(group)
+                logger.error(f"Batch claim {group[0][0]} failed: {error}")
+            elif cached:
+                summary["cached"] += len(group)
+            for claim_id, claim in group:
+                if error is not None:
+                    yield {"id": claim_id, "claim": claim, "error": str(error) or type(error).__name__}
+                    continue
+                record = {"id": claim_id, "claim": claim, "verdict": verdict.to_dict(),
+                          "cached": cached, "seconds": seconds}
+                if checkpoint is not None:
+                    checkpoint.append(record)
+                yield record
+        await stages  # re-raises anything that broke the pipeline itself
+    finally:
+        stages.cancel()
+
+    elapsed = time.perf_counter() - started
+    processed = summary["claims"] - summary["resumed"]
+    summary["seconds"] = round(elapsed, 2)
+    summary["claims_per_minute"] = round(processed / elapsed * 60, 1) if elapsed > 0 else 0.0
+    logger.info(f"Batch finished: {summary}")
+    yield {"summary": summary}
+
+
+async def _run_cli(args):
+    # Imported here: main builds the API's clients, caches and limiters on import
+    import main as app
+    from http_client import close_http_client
+    from extractor import shutdown_extractor
+
+    if args.input == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            text = f.read()
+    fmt = args.format or {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(
+        os.path.splitext(args.input)[1].lower()
+    )
+    claims = parse_claims(text, fmt)
+
+    checkpoint = None
+    if args.output != "-":
+        if args.restart and os.path.exists(args.output):
+            os.remove(args.output)
+        checkpoint = BatchCheckpoint(args.output)
+
+    out = sys.stdout
+    try:
+        # The pipeline prints progress; keep stdout for verdicts only
+        with contextlib.redirect_stdout(sys.stderr):
+            async for record in run_batch(claims, app.get_search_results, app.analyze_sources,
+                                          cache=app.verdict_cache, checkpoint=checkpoint,
+                                          search_workers=args.search_workers,
+                                          analyze_workers=args.analyze_workers):
+                if "summary" in record:
+                    summary = record["summary"]
+                    print(
+                        f"{summary['claims']} claims ({summary['unique']} checked, {summary['resumed']} resumed, "
+                        f"{summary['cached']} cached, {summary['errors']} failed) in {summary['seconds']}s: "
+                        f"{summary['claims_per_minute']} claims/min",
+                        file=sys.stderr,
+                    )
+                    print(f"Search: {app.search_client.stats()}, pages coalesced: {app.page_flights.stats()}",
+                          file=sys.stderr)
+                elif "error" in record:
+                    print(f"Claim {record['id']} failed (rerun to retry): {record['error']}", file=sys.stderr)
+                elif checkpoint is None:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        await close_http_client()
+        shutdown_extractor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fact-check a JSONL or CSV file of claims.")
+    parser.add_argument("input", help="claims file (.jsonl or .csv), or - for stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSONL verdicts file, also the checkpoint a rerun resumes from (default: stdout)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from the extension)")
+    parser.add_argument("--restart", action="store_true", help="discard the output file instead of resuming")
+    parser.add_argument("--search-workers", type=int, default=BATCH_SEARCH_WORKERS)
+    parser.add_argument("--analyze-workers", type=int, default=BATCH_ANALYZE_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    try:
+        asyncio.run(_run_cli(args))
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""End-to-end throughput and latency against local stand-ins for Google, Gemini and Telegram.
+
+Runs get_search_results -> analyze_sources (the API path) and the Telegram
+handle_message flow (the bot path) at a fixed concurrency, with Custom Search, news
+sites and Gemini served by benchmarks/fake_services.py. Reports claims per second,
+p50/p95/p99 latency per claim, event-loop lag and peak RSS. No network access or
+API keys are needed.
+
+    python benchmarks/bench_end_to_end.py [--scenario api bot] [--claims 200] [--concurrency 20]
+    python benchmarks/bench_end_to_end.py --output base.json        # record a baseline
+    python benchmarks/bench_end_to_end.py --baseline base.json      # exit 1 on a regression
+"""
+import os
+import io
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import importlib.util
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_DIR = os.path.join(BENCH_DIR, "..")
+RESULT_MARKER = "RESULT "
+
+sys.path.insert(0, BENCH_DIR)
+
+from bench_extract_loop_lag import monitor_lag  # noqa: E402
+from fake_services import add_arguments as add_service_arguments  # noqa: E402
+
+SERVICE_OPTIONS = ("sites", "articles", "paragraphs", "cse_latency", "page_latency",
+                   "slow_fraction", "slow_latency", "gemini_latency")
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(len(ordered) * q) - 1))] if ordered else float("nan")
+
+
+def claim_text(i: int) -> str:
+    return f"Claim {i}: the minister said the economy grew {i % 9 + 1} percent in quarter {i % 4 + 1}"
+
+
+def peak_rss_mb(pid="self") -> float:
+    """High-water resident set size from /proc (Linux), in MB."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+# ---- Telegram stand-in: just enough of Update/Context for the bot's handlers ----
+
+class FakeMessage:
+    def __init__(self, chat, text: str):
+        self.chat = chat
+        self.text = text
+        self.photo = []
+        self.message_id = 0
+
+    async def reply_text(self, text: str, **kwargs):
+        return await self.chat.send(text)
+
+
+class FakeChat:
+    def __init__(self, chat_id: int, latency: float):
+        self.id = chat_id
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, text: str):
+        await asyncio.sleep(self.latency)
+        self.sent.append(text)
+        message = FakeMessage(self, text)
+        message.message_id = len(self.sent)
+        return message
+
+
+class FakeBot:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def edit_message_text(self, **kwargs):
+        await asyncio.sleep(self.latency)
+
+    async def delete_message(self, **kwargs):
+        await asyncio.sleep(self.latency)
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class FakeUpdate:
+    def __init__(self, user_id: int, text: str, latency: float):
+        self.effective_user = FakeUser(user_id)
+        self.effective_chat = FakeChat(user_id, latency)
+        self.message = FakeMessage(self.effective_chat, text)
+
+
+class FakeContext:
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+
+
+# ---- Worker: one scenario in a fresh process, configured through the environment ----
+
+def load_pipeline(scenario: str, telegram_latency: float):
+    """Returns check(i, claim) -> bool for the scenario, and the module it came from."""
+    sys.path.insert(0, BOT_DIR)
+    if scenario == "api":
+        import main as module
+
+        async def check(i: int, claim: str) -> bool:
+            documents = await module.get_search_results(claim)
+            verdict = await module.analyze_sources(claim, documents)
+            return bool(verdict.sources)
+    else:
+        spec = importlib.util.spec_from_file_location("only_bot", os.path.join(BOT_DIR, "only-bot.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        handler = module.admitted(module.handle_message)
+        bot = FakeBot(telegram_latency)
+
+        async def check(i: int, claim: str) -> bool:
+            update = FakeUpdate(i, claim, telegram_latency)
+            await handler(update, FakeContext(bot))
+            sent = update.effective_chat.sent
+            return bool(sent) and "VERDICT" in sent[-1]
+    return check, module
+
+
+async def run_scenario(check, claims: int, concurrency: int, warmup: int) -> dict:
+    for i in range(warmup):
+        await check(-1 - i, claim_text(-1 - i))
+
+    latencies, failures = [], 0
+    queue = asyncio.Queue()
+    for i in range(claims):
+        queue.put_nowait(i)
+
+    async def client():
+        nonlocal failures
+        while not queue.empty():
+            i = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                ok = await check(i, claim_text(i))
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            failures += not ok
+
+    lag, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(lag, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    latencies.sort()
+    lag.sort()
+    return {
+        "claims": claims,
+        "concurrency": concurrency,
+        "failures": failures,
+        "wall_s": round(wall, 2),
+        "claims_per_s": round(claims / wall, 2),
+        "p50_s": round(percentile(latencies, 0.50), 3),
+        "p95_s": round(percentile(latencies, 0.95), 3),
+        "p99_s": round(percentile(latencies, 0.99), 3),
+        "loop_lag_p50_ms": round(percentile(lag, 0.50) * 1000, 1),
+        "loop_lag_p99_ms": round(percentile(lag, 0.99) * 1000, 1),
+        "loop_lag_max_ms": round(lag[-1] * 1000, 1) if lag else float("nan"),
+    }
+
+
+def worker(args):
+    # Pipeline modules print progress; only the result line goes to stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        check, module = load_pipeline(args.worker, args.telegram_latency)
+        import extractor
+        from http_client import close_http_client
+
+        async def run():
+            try:
+                return await run_scenario(check, args.claims, args.concurrency, args.warmup)
+            finally:
+                await close_http_client()
+
+        result = asyncio.run(run())
+        pool = getattr(extractor, "_pool", None)
+        workers = list(getattr(pool, "_processes", {}) or {})
+        result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+        result["extract_workers_peak_rss_mb"] = round(sum(peak_rss_mb(pid) for pid in workers), 1)
+        result["gemini"] = module.gemini.usage()
+        extractor.shutdown_extractor()
+    print(RESULT_MARKER + json.dumps(result), flush=True)
+
+
+# ---- Driver ----
+
+def start_services(args) -> tuple:
+    command = [sys.executable, os.path.join(BENCH_DIR, "fake_services.py")]
+    for option in SERVICE_OPTIONS:
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    services = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    ports = json.loads(services.stdout.readline())
+    return services, ports
+
+
+def scenario_env(args, ports: dict, state_dir: str) -> dict:
+    api = f"http://127.0.0.1:{ports['api']}"
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_API_KEY": "bench", "GOOGLE_CSE_ID": "bench", "GEMINI_API_KEY": "bench",
+        "TELEGRAM_API_KEY": "0:bench",
+        "GOOGLE_CSE_ENDPOINT": f"{api}/customsearch/v1",
+        "GEMINI_BASE_URL": api,
+        # Fresh caches and limiter state per run
+        "VERDICT_CACHE_PATH": os.path.join(state_dir, "verdicts.sqlite3"),
+        "LIMITER_STATE_PATH": os.path.join(state_dir, "limiters.sqlite3"),
+        "BATCH_CHECKPOINT_DIR": os.path.join(state_dir, "batches"),
+    })
+    # Quotas are not what is being measured, unless asked for
+    env.setdefault("GEMINI_RPM", "1000000")
+    env.setdefault("SEARCH_RPM", "1000000")
+    # Every simulated user sends one claim at a time, so only the global cap would queue them
+    env.setdefault("ADMISSION_WORKERS", str(args.concurrency))
+    return env
+
+
+def run_worker(args, scenario: str, env: dict) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--worker", scenario,
+               "--claims", str(args.claims), "--concurrency", str(args.concurrency),
+               "--warmup", str(args.warmup), "--telegram-latency", str(args.telegram_latency)]
+    completed = subprocess.run(command, cwd=BOT_DIR, env=env, capture_output=True, text=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{scenario} run failed:\n{completed.stderr[-3000:]}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions beyond tolerance: lower throughput, or higher p95 latency or loop lag."""
+    problems = []
+    for scenario, result in results.items():
+        base = baseline.get(scenario)
+        if base is None:
+            continue
+        if result["claims_per_s"] < base["claims_per_s"] * (1 - tolerance):
+            problems.append(f"{scenario}: throughput {result['claims_per_s']}/s vs {base['claims_per_s']}/s")
+        if result["p95_s"] > base["p95_s"] * (1 + tolerance):
+            problems.append(f"{scenario}: p95 {result['p95_s']}s vs {base['p95_s']}s")
+        # Lag in the low milliseconds is noise; only flag it once it matters
+        if result["loop_lag_p99_ms"] > max(base["loop_lag_p99_ms"] * (1 + tolerance), 20):
+            problems.append(f"{scenario}: loop lag p99 {result['loop_lag_p99_ms']} ms vs {base['loop_lag_p99_ms']} ms")
+        if result["failures"] > base["failures"]:
+            problems.append(f"{scenario}: {result['failures']} failed claims vs {base['failures']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=("api", "bot"), default=["api", "bot"])
+    parser.add_argument("--claims", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured claims first (imports, pools)")
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="seconds per Telegram API call")
+    parser.add_argument("--output", help="write the results as JSON (e.g. to use as a baseline)")
+    parser.add_argument("--baseline", help="results JSON to compare against; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    parser.add_argument("--worker", choices=("api", "bot"), help=argparse.SUPPRESS)
+    add_service_arguments(parser)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    services, ports = start_services(args)
+    results = {}
+    try:
+        print(f"{args.claims} claims at concurrency {args.concurrency}; fake services: CSE {args.cse_latency}s, "
+              f"pages {args.page_latency}s ({args.slow_fraction:.0%} at {args.slow_latency}s), "
+              f"Gemini {args.gemini_latency}s, {args.sites} sites\n")
+        for scenario in args.scenario:
+            with tempfile.TemporaryDirectory() as state_dir:
+                result = results[scenario] = run_worker(args, scenario, scenario_env(args, ports, state_dir))
+            print(f"{scenario:>4}: {result['claims_per_s']:.2f} claims/s | latency p50 {result['p50_s']:.2f}s "
+                  f"p95 {result['p95_s']:.2f}s p99 {result['p99_s']:.2f}s | loop lag p99 "
+                  f"{result['loop_lag_p99_ms']:.1f} ms, max {result['loop_lag_max_ms']:.1f} ms | "
+                  f"peak RSS {result['peak_rss_mb']:.0f} MB (+{result['extract_workers_peak_rss_mb']:.0f} MB "
+                  f"extract workers) | {result['failures']} failed")
+    finally:
+        services.terminate()
+        services.wait(timeout=10)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Event-loop lag while 50 concurrent claims extract their 5 source pages.
+
+Compares inline trafilatura extraction (EXTRACT_POOL_SIZE=0, the old
+behaviour) with the process pool in extractor.py.
+
+    python benchmarks/bench_extract_loop_lag.py [--claims 50] [--pages 5]
+"""
+import os
+import sys
+import math
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import extractor  # noqa: E402
+
+WORDS = ("government report claims economy growth percent minister said according "
+         "sources official data election vaccine study researchers university").split()
+
+
+def make_article(paragraphs: int = 300, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    body = "".join(
+        "<p>" + " ".join(rng.choice(WORDS) for _ in range(60)) + ".</p>\n"
+        for _ in range(paragraphs)
+    )
+    nav = "".join(f"<li><a href='/s/{i}'>Section {i}</a></li>" for i in range(200))
+    return (f"<html><head><title>Article {seed}</title></head><body><nav><ul>{nav}</ul></nav>"
+            f"<article><h1>Headline {seed}</h1>{body}</article><footer>footer</footer></body></html>").encode()
+
+
+async def monitor_lag(samples: list, stop: asyncio.Event, interval: float = 0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def run(claims: int, pages: int, documents: list) -> dict:
+    samples, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(samples, stop))
+
+    async def claim(i):
+        return await asyncio.gather(*(extractor.extract_text(documents[(i + p) % len(documents)])
+                                      for p in range(pages)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(claim(i) for i in range(claims)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+
+    samples.sort()
+    return {
+        "wall_s": elapsed,
+        "lag_p50_ms": statistics.median(samples) * 1000,
+        "lag_p95_ms": samples[math.ceil(len(samples) * 0.95) - 1] * 1000,
+        "lag_max_ms": samples[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--claims", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=extractor.EXTRACT_POOL_SIZE)
+    args = parser.parse_args()
+
+    documents = [make_article(seed=i) for i in range(20)]
+    print(f"{args.claims} claims x {args.pages} pages, ~{len(documents[0]) // 1024} KB per page\n")
+
+    for label, pool_size in (("inline", 0), (f"pool({args.pool_size})", args.pool_size)):
+        extractor.EXTRACT_POOL_SIZE = pool_size
+        result = asyncio.run(run(args.claims, args.pages, documents))
+        extractor.shutdown_extractor()
+        print(f"{label:>10}: wall {result['wall_s']:.2f}s | loop lag p50 {result['lag_p50_ms']:.1f} ms, "
+              f"p95 {result['lag_p95_ms']:.1f} ms, max {result['lag_max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
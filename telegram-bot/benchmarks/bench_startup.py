@@ -0,0 +1,93 @@
+"""Cold-start cost of the API server: module import time and time until /healthz and /readyz answer.
+
+    python benchmarks/bench_startup.py [--modes lite full] [--runs 3] [--output startup.json]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import httpx
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BOT_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(url: str, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(url, timeout=0.5).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    return float("nan")
+
+
+def measure_server(env: dict, timeout: float) -> tuple:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        healthy = wait_for(f"http://127.0.0.1:{port}/healthz", started, timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/readyz", started, timeout)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return healthy, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["lite"], choices=["lite", "lazy", "full"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="append results as JSON lines to this file")
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        env = dict(os.environ, STARTUP_MODE=mode, RUN_TELEGRAM_BOT="0")
+        imports, healthy, ready = [], [], []
+        for _ in range(args.runs):
+            imports.append(measure_import(env))
+            h, r = measure_server(env, args.timeout)
+            healthy.append(h)
+            ready.append(r)
+
+        result = {
+            "mode": mode,
+            "runs": args.runs,
+            "import_s": round(statistics.median(imports), 3),
+            "healthz_s": round(statistics.median(healthy), 3),
+            "readyz_s": round(statistics.median(ready), 3),
+        }
+        print(f"{mode:>5}: import {result['import_s']:.3f}s | /healthz {result['healthz_s']:.3f}s | "
+              f"/readyz {result['readyz_s']:.3f}s (median of {args.runs})")
+        if args.output:
+            with open(args.output, "a") as f:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
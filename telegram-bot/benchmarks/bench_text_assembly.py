@@ -0,0 +1,104 @@
+"""Text assembly over 1 MB documents: chunk_text and the Source Content block sent to Gemini.
+
+Compares the old implementations (split('.') with `+=` chunks, `+=` over every
+source) with the current ones (real sentence splitter, list accumulation + join).
+
+    python benchmarks/bench_text_assembly.py [--mb 1] [--sources 5] [--runs 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("STARTUP_MODE", "lite")
+
+from main import chunk_text  # noqa: E402
+
+WORDS = ("government report claims economy growth percent minister said according "
+         "sources official data election vaccine study researchers university").split()
+SENTENCE_TAILS = ("rose 3.5 percent.", "said Dr. Rao of the U.S. office.", "was confirmed on Jan. 4.", "was denied.")
+
+
+def make_document(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences, total = [], 0
+    while total < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 25))).capitalize()
+        sentence += " " + rng.choice(SENTENCE_TAILS)
+        sentences.append(sentence)
+        total += len(sentence) + 1
+        if rng.random() < 0.1:
+            sentences.append("\n")
+    return " ".join(sentences)
+
+
+def legacy_chunk_text(text: str, max_chunk_size: int = 4000) -> list:
+    chunks = []
+    current_chunk = ""
+    for sentence in text.split('.'):
+        if len(current_chunk) + len(sentence) < max_chunk_size:
+            current_chunk += sentence + '.'
+        else:
+            if current_chunk:
+                chunks.append(current_chunk)
+            current_chunk = sentence + '.'
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def legacy_render(sources: list) -> str:
+    all_results = "Source Content:\n\n"
+    for i, content in enumerate(sources, 1):
+        all_results += f"\n=== Source {i}: [example.com] Title {i} ===\n"
+        all_results += f"{content}\n"
+        all_results += "\n---\n"
+    return all_results
+
+
+def render(sources: list) -> str:
+    parts = ["Source Content:\n\n"]
+    for i, content in enumerate(sources, 1):
+        parts.append(f"\n=== Source {i}: [example.com] Title {i} ===\n{content}\n\n---\n")
+    return "".join(parts)
+
+
+def mid_sentence(chunks: list) -> int:
+    endings = tuple(tail.rsplit(" ", 1)[-1] for tail in SENTENCE_TAILS)
+    return sum(not chunk.rstrip().endswith(endings) for chunk in chunks[:-1])
+
+
+def best_of(runs: int, fn, *args) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=1.0, help="size of each document in MB")
+    parser.add_argument("--sources", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    size = int(args.mb * 1024 * 1024)
+    documents = [make_document(size, seed) for seed in range(args.sources)]
+    assert render(documents) == legacy_render(documents)
+
+    chunks = chunk_text(documents[0])
+    print(f"{args.sources} document(s) of {size / 1e6:.2f} MB, best of {args.runs} runs")
+    print(f"chunk_text   old {best_of(args.runs, legacy_chunk_text, documents[0]) * 1000:8.1f} ms | "
+          f"new {best_of(args.runs, chunk_text, documents[0]) * 1000:8.1f} ms  ({len(chunks)} chunks)")
+    print(f"render       old {best_of(args.runs, legacy_render, documents) * 1000:8.1f} ms | "
+          f"new {best_of(args.runs, render, documents) * 1000:8.1f} ms")
+    print(f"chunks cut mid-sentence (decimal/abbreviation): old {mid_sentence(legacy_chunk_text(documents[0]))} | "
+          f"new {mid_sentence(chunks)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Local stand-ins for Google Custom Search, news sites and Gemini, for offline benchmarks.
+
+    python benchmarks/fake_services.py [--sites 20] [--page-latency 0.3] [--gemini-latency 1.5]
+
+Prints {"api": port, "sites": [ports]} on one line once listening, then serves until
+killed. Point the bot at it with GOOGLE_CSE_ENDPOINT=http://127.0.0.1:<api>/customsearch/v1
+and GEMINI_BASE_URL=http://127.0.0.1:<api>. Every site is its own port, so per-host
+connection caps behave as they would against real, separate news sites.
+"""
+import os
+import re
+import sys
+import json
+import random
+import socket
+import asyncio
+import hashlib
+import argparse
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_extract_loop_lag import make_article  # noqa: E402
+
+_BATCH_CLAIM = re.compile(r"##### CLAIM (\d+):")
+_HEADLINE = re.compile(r"^(\d+)\. TITLE:", re.MULTILINE)
+
+VERDICT_TEXT = (
+    "VERDICT: FALSE\n\n"
+    "EVIDENCE:\n- Source 1 reports growth of 2 percent, not the figure claimed\n"
+    "- Source 2 quotes the official data release\n\n"
+    "SOURCE SUMMARY:\nSource 1: official figures contradict the claim.\n"
+    "Source 2: the minister's statement was misquoted.\n\n"
+    "RHETORIC ASSESSMENT:\nNo significant issues.\n\n"
+    "CONCLUSION: The sources consistently contradict the claim."
+)
+
+
+def latency(median: float, sigma: float = 0.5) -> float:
+    """Log-normal around the median: most calls near it, a long tail of slow ones."""
+    return median * random.lognormvariate(0, sigma) if median > 0 else 0.0
+
+
+def build_app(args, site_ports: list) -> FastAPI:
+    app = FastAPI()
+    pages = {}
+
+    def article_url(article: int) -> str:
+        return f"http://127.0.0.1:{site_ports[article % len(site_ports)]}/article/{article}"
+
+    @app.get("/customsearch/v1")
+    async def search(q: str = "", num: int = 10):
+        await asyncio.sleep(latency(args.cse_latency))
+        # The same query always gets the same results; different queries share a pool of articles
+        rng = random.Random(hashlib.sha1(q.encode()).digest())
+        articles = rng.sample(range(args.articles), min(num, 10, args.articles))
+        return {"items": [
+            {"title": f"Report {article}: {q[:80]}", "link": article_url(article),
+             "snippet": f"Officials responded to claims that {q[:100]}"}
+            for article in articles
+        ]}
+
+    @app.get("/article/{article}")
+    async def article(article: int):
+        slow = random.random() < args.slow_fraction
+        await asyncio.sleep(args.slow_latency if slow else latency(args.page_latency))
+        if article not in pages:
+            pages[article] = make_article(paragraphs=args.paragraphs, seed=article)
+        return HTMLResponse(pages[article])
+
+    @app.post("/v1beta/models/{target}")
+    async def generate(target: str, request: Request):
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for content in body.get("contents", [])
+                         for part in content.get("parts", []))
+        await asyncio.sleep(latency(args.gemini_latency))
+
+        if (body.get("generationConfig") or {}).get("responseMimeType") == "application/json":
+            # A verdict batch: one structured answer per claim in the prompt
+            text = json.dumps([
+                {"id": int(number), "verdict": "FALSE", "evidence": "Source 1 contradicts the claim.",
+                 "source_summary": "Source 1: official figures differ.", "rhetoric": "",
+                 "conclusion": "The sources contradict the claim."}
+                for number in _BATCH_CLAIM.findall(prompt)
+            ])
+        elif _HEADLINE.search(prompt):
+            text = "\n".join(f"{number}: None" for number in _HEADLINE.findall(prompt))
+        elif "Extract the text" in prompt:
+            text = "BREAKING: Minister says economy grew 9 percent"
+        else:
+            text = VERDICT_TEXT
+
+        prompt_tokens = len(prompt) // 4
+        output_tokens = len(text) // 4
+        return JSONResponse({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                            "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens,
+                              "totalTokenCount": prompt_tokens + output_tokens},
+        })
+
+    return app
+
+
+def listen() -> socket.socket:
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1024)
+    return sock
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--sites", type=int, default=20, help="news sites (ports) the articles are spread over")
+    parser.add_argument("--articles", type=int, default=400, help="distinct articles search results point to")
+    parser.add_argument("--paragraphs", type=int, default=80, help="paragraphs per article (~0.4 KB each)")
+    parser.add_argument("--cse-latency", type=float, default=0.15, help="median Custom Search latency, seconds")
+    parser.add_argument("--page-latency", type=float, default=0.3, help="median article latency, seconds")
+    parser.add_argument("--slow-fraction", type=float, default=0.05, help="share of page loads that are stragglers")
+    parser.add_argument("--slow-latency", type=float, default=4.0, help="straggler latency, seconds")
+    parser.add_argument("--gemini-latency", type=float, default=1.5, help="median Gemini latency, seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    api = listen()
+    sites = [listen() for _ in range(max(1, args.sites))]
+    site_ports = [sock.getsockname()[1] for sock in sites]
+    app = build_app(args, site_ports)
+    print(json.dumps({"api": api.getsockname()[1], "sites": site_ports}), flush=True)
+
+    config = uvicorn.Config(app, log_level="warning", access_log=False, backlog=1024)
+    uvicorn.Server(config).run(sockets=[api, *sites])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Within this window a cached page is served without touching the network at all
+CONTENT_CACHE_FRESH_SECONDS = float(os.getenv("CONTENT_CACHE_FRESH_SECONDS", "300"))
+
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref_src", "cmpid")
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def canonical_url(url: str) -> str:
+    """Normalizes a URL so the same article reached via different links shares one entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and str(parts.port) != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class CachedPage:
+    __slots__ = ("text", "etag", "last_modified", "fetched_at", "size")
+
+    def __init__(self, text: str, etag: str = None, last_modified: str = None):
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        self.size = len(text.encode("utf-8"))
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.fetched_at < CONTENT_CACHE_FRESH_SECONDS
+
+    def validators(self) -> dict:
+        """Headers for a conditional GET against the origin."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ContentCache:
+    """Byte-bounded LRU of extracted page text keyed by canonical URL."""
+
+    def __init__(self, max_bytes: int = CONTENT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, url: str):
+        with self.lock:
+            page = self.pages.get(canonical_url(url))
+            if page is not None:
+                self.pages.move_to_end(canonical_url(url))
+            return page
+
+    def put(self, url: str, page: CachedPage):
+        key = canonical_url(url)
+        with self.lock:
+            old = self.pages.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            if page.size > self.max_bytes:
+                return
+            self.pages[key] = page
+            self.total_bytes += page.size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.pages.popitem(last=False)
+                self.total_bytes -= evicted.size
+
+    def touch(self, page: CachedPage):
+        """Marks a page as confirmed current by the origin (HTTP 304)."""
+        page.fetched_at = time.monotonic()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated_304": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0,
+            "entries": len(self.pages),
+            "bytes": self.total_bytes,
+        }
+
+
+content_cache = ContentCache()
@@ -0,0 +1,213 @@
+import os
+import re
+import numpy as np
+
+# Per-claim budget for source text sent to Gemini (~4 characters per token)
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "1500"))
+CHARS_PER_TOKEN = 4
+# Passage retrieval: sources are cut into windows of this many sentences, the best k per source are kept
+PASSAGE_SENTENCES = int(os.getenv("PASSAGE_SENTENCES", "3"))
+PASSAGE_TOP_K = int(os.getenv("PASSAGE_TOP_K", "4"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Terminal punctuation (plus a closing quote/bracket) followed by whitespace and a capital or digit.
+# Matching the punctuation itself, not a lookbehind, lets the regex engine skip ahead quickly.
+_SENTENCE_END = re.compile(r"[.!?…][\"'”’)\]]?\s+(?=[\"'“‘(\[]?[A-Z0-9])")
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "inc", "ltd", "co", "corp",
+    "vol", "fig", "gen", "gov", "sen", "rep", "rev", "lt", "col", "sgt", "capt", "approx", "est",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    "e.g", "i.e", "u.s", "u.k", "u.n", "a.m", "p.m",
+}
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his i if in into is it its of on or
+our she so than that the their them there these they this to was we were what when which who will
+with would you your not no can could said says also about after over more most other some such
+""".split())
+
+
+def _pieces(paragraph: str):
+    start = 0
+    for match in _SENTENCE_END.finditer(paragraph):
+        end = match.start() + len(match.group().rstrip())
+        yield paragraph[start:end]
+        start = match.end()
+    yield paragraph[start:]
+
+
+def split_sentences(text: str) -> list:
+    """Splits text into sentences without breaking on decimals, initials or common abbreviations."""
+    sentences = []
+    for paragraph in text.splitlines():
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pending = ""
+        for piece in _pieces(paragraph):
+            pending = f"{pending} {piece}" if pending else piece
+            last = piece[piece.rfind(" ") + 1:]
+            word = last[:-1].lstrip("\"'“‘([").lower() if last.endswith(".") else ""
+            # "Dr." / "U.S." / "J." end a token, not a sentence
+            if word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                continue
+            sentences.append(pending)
+            pending = ""
+        if pending:
+            sentences.append(pending)
+    return sentences
+
+
+def _terms(text: str) -> list:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def _term_counts(documents: list):
+    """Sparse term counts for a list of documents: (doc ids, term ids, counts, vocabulary)."""
+    vocabulary = {}
+    doc_ids, term_ids = [], []
+    for did, document in enumerate(documents):
+        for term in _terms(document):
+            doc_ids.append(did)
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+    if not term_ids:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, vocabulary
+    # Flattened (document, term) pairs counted in one np.unique call
+    pairs = np.asarray(doc_ids, dtype=np.int64) * len(vocabulary) + np.asarray(term_ids, dtype=np.int64)
+    unique_pairs, counts = np.unique(pairs, return_counts=True)
+    pair_docs, pair_terms = np.divmod(unique_pairs, len(vocabulary))
+    return pair_docs, pair_terms, counts, vocabulary
+
+
+def bm25_scores(query: str, documents: list) -> np.ndarray:
+    """Okapi BM25 score of every document against the query, vectorized over all (document, term) pairs."""
+    n_documents = len(documents)
+    pair_docs, pair_terms, counts, vocabulary = _term_counts(documents)
+    claim_ids = [vocabulary[t] for t in set(_terms(query)) if t in vocabulary]
+    if not claim_ids:
+        return np.zeros(n_documents)
+
+    document_frequency = np.bincount(pair_terms, minlength=len(vocabulary))
+    idf = np.log(1.0 + (n_documents - document_frequency + 0.5) / (document_frequency + 0.5))
+    lengths = np.bincount(pair_docs, weights=counts, minlength=n_documents)
+    normalized = 1.0 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0)
+
+    in_query = np.zeros(len(vocabulary), dtype=bool)
+    in_query[claim_ids] = True
+    matched = in_query[pair_terms]
+    tf = counts[matched]
+    weights = idf[pair_terms[matched]] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * normalized[pair_docs[matched]])
+    return np.bincount(pair_docs[matched], weights=weights, minlength=n_documents)
+
+
+def select_passages(claim: str, sources: list, top_k: int = PASSAGE_TOP_K,
+                    sentences_per_passage: int = PASSAGE_SENTENCES) -> list:
+    """Keeps the top_k passages of each source that best match the claim (BM25).
+
+    Every passage of every source is ranked in one pass, so document frequencies come
+    from all the evidence gathered for the claim. The result is aligned with sources
+    (attribution is unchanged); kept passages stay in original order, with gaps marked "…".
+    """
+    passages, owners = [], []
+    for index, text in enumerate(sources):
+        sentences = split_sentences(text or "")
+        for start in range(0, len(sentences), sentences_per_passage):
+            passages.append(" ".join(sentences[start:start + sentences_per_passage]))
+            owners.append(index)
+    if not passages:
+        return ["" for _ in sources]
+
+    owners = np.asarray(owners)
+    positions = np.arange(len(passages)) - np.searchsorted(owners, owners)
+    relevance = bm25_scores(claim, passages)
+    # Ledes win ties, so a source that never names the claim's terms still contributes its opening
+    scores = relevance + 0.01 / (1.0 + positions)
+
+    # Rank within each source: sort by (source, -score), then take the first top_k of every run.
+    # Passages sharing no term with the claim are dropped, except a source's best one.
+    order = np.lexsort((-scores, owners))
+    rank = np.arange(len(passages)) - np.searchsorted(owners[order], owners[order])
+    chosen = (rank < top_k) & ((relevance[order] > 0) | (rank == 0))
+    keep = np.zeros(len(passages), dtype=bool)
+    keep[order[chosen]] = True
+
+    selected = [[] for _ in sources]
+    previous = [None] * len(sources)
+    for pid in np.flatnonzero(keep).tolist():
+        owner = int(owners[pid])
+        position = int(positions[pid])
+        if previous[owner] is not None and position != previous[owner] + 1:
+            selected[owner].append("…")
+        selected[owner].append(passages[pid])
+        previous[owner] = position
+    return [" ".join(parts) for parts in selected]
+
+
+def summarize_sources(claim: str, sources: list, token_budget: int = SUMMARY_TOKEN_BUDGET) -> list:
+    """Keeps the sentences of each source most relevant to the claim, within a shared token budget.
+
+    All sources are scored in one vectorized TF-IDF pass (each sentence is a document).
+    Every source gets an equal share of the budget; what a short source doesn't use is
+    handed to the best remaining sentences overall. Kept sentences stay in original order.
+    Empty sources come back as "".
+    """
+    char_budget = token_budget * CHARS_PER_TOKEN
+    if sum(len(s) for s in sources if s) <= char_budget:
+        return [s or "" for s in sources]
+
+    sentences, owners = [], []
+    for index, text in enumerate(sources):
+        for sentence in split_sentences(text or ""):
+            sentences.append(sentence)
+            owners.append(index)
+    if not sentences:
+        return ["" for _ in sources]
+
+    n_sentences = len(sentences)
+    owners = np.asarray(owners)
+    lengths = np.fromiter((len(s) + 1 for s in sentences), dtype=np.int64, count=n_sentences)
+    scores = np.zeros(n_sentences)
+
+    pair_sentences, pair_terms, counts, vocabulary = _term_counts(sentences)
+    claim_ids = [vocabulary[t] for t in set(_terms(claim)) if t in vocabulary]
+    if claim_ids:
+        document_frequency = np.bincount(pair_terms, minlength=len(vocabulary))
+        idf = np.log((1 + n_sentences) / (1 + document_frequency)) + 1.0
+        weights = (1.0 + np.log(counts)) * idf[pair_terms]
+
+        query = np.zeros(len(vocabulary))
+        query[claim_ids] = idf[claim_ids]
+        norms = np.sqrt(np.bincount(pair_sentences, weights=weights ** 2, minlength=n_sentences))
+        dots = np.bincount(pair_sentences, weights=weights * query[pair_terms], minlength=n_sentences)
+        scores = dots / np.maximum(norms, 1e-9) / np.linalg.norm(query)
+
+    # Slight preference for earlier sentences (ledes) breaks ties among unrelated sentences
+    positions = np.arange(n_sentences) - np.searchsorted(owners, owners)
+    scores = scores + 0.01 / (1.0 + positions)
+
+    # Greedy selection runs on plain lists; numpy scalar indexing is slow in a Python loop
+    order = np.argsort(-scores, kind="stable").tolist()
+    owner_of = owners.tolist()
+    length_of = lengths.tolist()
+    keep = [False] * n_sentences
+    share = char_budget // len(set(owner_of))
+    used = [0] * len(sources)
+    for sid in order:
+        owner = owner_of[sid]
+        if used[owner] + length_of[sid] <= share:
+            keep[sid] = True
+            used[owner] += length_of[sid]
+
+    remaining = char_budget - sum(used)
+    for sid in order:
+        if not keep[sid] and length_of[sid] <= remaining:
+            keep[sid] = True
+            remaining -= length_of[sid]
+
+    summaries = [[] for _ in sources]
+    for sid in range(n_sentences):
+        if keep[sid]:
+            summaries[owner_of[sid]].append(sentences[sid])
+    return [" ".join(parts) for parts in summaries]
@@ -0,0 +1,127 @@
+import os
+import signal
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# 0 runs extraction inline on the event loop (the old behaviour)
+EXTRACT_POOL_SIZE = int(os.getenv("EXTRACT_POOL_SIZE", str(max(1, (os.cpu_count() or 2) - 1))))
+EXTRACT_CPU_BUDGET = float(os.getenv("EXTRACT_CPU_BUDGET", "5"))  # CPU seconds per page
+# Wall-clock backstop for pages stuck inside C code where the CPU timer can't interrupt
+EXTRACT_WALL_TIMEOUT = float(os.getenv("EXTRACT_WALL_TIMEOUT", str(EXTRACT_CPU_BUDGET * 3)))
+
+_QUEUE_POLL = 0.05  # seconds between checks whether a queued page has reached a worker
+
+
+class CpuBudgetExceeded(BaseException):
+    """BaseException so trafilatura's internal `except Exception` blocks can't swallow it."""
+
+
+def _on_cpu_budget(signum, frame):
+    raise CpuBudgetExceeded()
+
+
+def _extract_worker(html: bytes, cpu_budget: float) -> str:
+    """Runs in a pool process: extracts main text under a per-page CPU-time budget."""
+    use_timer = cpu_budget > 0 and hasattr(signal, "setitimer")
+    if use_timer:
+        signal.signal(signal.SIGPROF, _on_cpu_budget)
+        signal.setitimer(signal.ITIMER_PROF, cpu_budget)
+    try:
+        import trafilatura
+        return trafilatura.extract(html) or ""
+    except CpuBudgetExceeded:
+        return None
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+
+_pool = None
+_generation = 0  # bumped whenever the pool is replaced, so one broken pool is only recycled once
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Fork keeps workers from re-importing the bot's main module (and its models)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_POOL_SIZE, mp_context=context)
+    return _pool
+
+
+def _recycle_pool(generation: int):
+    """Kills every worker of that pool generation; a no-op once the pool has been replaced.
+
+    Used when a page blows through the wall-clock backstop. The other calls in flight on
+    the old pool fail with BrokenProcessPool and are resubmitted by extract_text.
+    """
+    global _pool, _generation
+    if _pool is None or generation != _generation:
+        return
+    pool, _pool = _pool, None
+    _generation += 1
+    # ProcessPoolExecutor has no public way to kill a busy worker
+    for process in list(getattr(pool, "_processes", {}).values()):
+        process.kill()
+    # No cancel_futures: queued calls must fail as broken (and be resubmitted), not be cancelled
+    pool.shutdown(wait=False)
+
+
+async def _await_call(future, timeout: float):
+    """Result of a pool call; TimeoutError once it has been running for timeout seconds.
+
+    Time spent queued behind other pages doesn't count, so pages waiting behind a hung one
+    aren't blamed for it. The pool marks a call running when it hands it to the workers'
+    queue, which can run one call ahead of the workers themselves.
+    """
+    waiter = asyncio.wrap_future(future)
+    while not future.running() and not future.done():
+        await asyncio.wait({waiter}, timeout=_QUEUE_POLL)
+    return await asyncio.wait_for(waiter, timeout=timeout)
+
+
+async def extract_text(html) -> str:
+    """Extracts the main text of an HTML page off the event loop. Returns "" on failure."""
+    if isinstance(html, str):
+        html = html.encode("utf-8", errors="replace")
+
+    if EXTRACT_POOL_SIZE <= 0:
+        import trafilatura
+        return trafilatura.extract(html) or ""
+
+    attempts = 2  # a page caught in a pool that another page's timeout took down gets one more try
+    while True:
+        pool, generation = _get_pool(), _generation
+        try:
+            text = await _await_call(pool.submit(_extract_worker, html, EXTRACT_CPU_BUDGET), EXTRACT_WALL_TIMEOUT)
+            break
+        except asyncio.TimeoutError:
+            logger.warning(f"Extraction exceeded {EXTRACT_WALL_TIMEOUT}s wall time; recycling workers")
+            _recycle_pool(generation)
+            return ""
+        except BrokenProcessPool:
+            _recycle_pool(generation)
+            attempts -= 1
+            if attempts == 0:
+                logger.warning("Extraction pool broke again on resubmit; giving up on this page")
+                return ""
+            logger.info("Extraction pool was recycled mid-call; resubmitting")
+
+    if text is None:
+        logger.warning(f"Page exceeded the {EXTRACT_CPU_BUDGET}s CPU budget for extraction")
+        return ""
+    return text
+
+
+def shutdown_extractor():
+    global _pool, _generation
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _generation += 1
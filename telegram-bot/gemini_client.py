@@ -0,0 +1,157 @@
+import os
+import random
+import asyncio
+import logging
+from contextlib import asynccontextmanager, nullcontext
+import httpx
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))  # seconds per attempt
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")  # e.g. a proxy, or the offline benchmark's stub server
+
+
+def _is_retryable(error: Exception) -> bool:
+    code = getattr(error, "code", None)
+    if isinstance(code, int):  # google.genai.errors.APIError
+        return code == 429 or code >= 500
+    return isinstance(error, (asyncio.TimeoutError, httpx.TransportError))
+
+
+def _retry_after(error: Exception):
+    """Seconds from a Retry-After header on the failed response, if there was one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _feedback(limiter, error: Exception = None):
+    """Tells an adaptive limiter how the upstream responded (plain limiters are left alone)."""
+    if limiter is None or not hasattr(limiter, "on_throttle"):
+        return
+    if error is None:
+        limiter.on_success()
+    elif getattr(error, "code", None) == 429:
+        limiter.on_throttle(_retry_after(error))
+
+
+class GeminiClient:
+    """Async Gemini adapter: bounded concurrency, per-call timeouts, jittered retries, token usage."""
+
+    def __init__(self, api_key: str, max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+                 timeout: float = GEMINI_TIMEOUT, max_retries: int = GEMINI_MAX_RETRIES):
+        self.api_key = api_key
+        self._client = None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.usage_by_model = {}
+
+    @property
+    def client(self):
+        # google-genai is slow to import, so it is only loaded when the first call is made
+        if self._client is None:
+            from google import genai
+            http_options = {"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+            self._client = genai.Client(api_key=self.api_key, http_options=http_options)
+        return self._client
+
+    def _record(self, model: str, response=None, retried: bool = False, failed: bool = False):
+        usage = self.usage_by_model.setdefault(model, {
+            "calls": 0, "retries": 0, "failures": 0,
+            "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+        })
+        if retried:
+            usage["retries"] += 1
+            return
+        if failed:
+            usage["failures"] += 1
+            return
+        usage["calls"] += 1
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata is not None:
+            usage["prompt_tokens"] += metadata.prompt_token_count or 0
+            usage["output_tokens"] += metadata.candidates_token_count or 0
+            usage["total_tokens"] += metadata.total_token_count or 0
+
+    @asynccontextmanager
+    async def _attempt(self, limiter):
+        """One rate-limited, concurrency-bounded slot for a single API attempt."""
+        async with (limiter if limiter is not None else nullcontext()):
+            async with self.slots:
+                yield
+
+    async def _backoff(self, model: str, attempt: int, error: Exception):
+        self._record(model, retried=True)
+        delay = _retry_after(error)
+        if delay is None:
+            # Full jitter keeps a burst of throttled callers from retrying in lockstep
+            delay = random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt))
+        logger.warning(f"Gemini {model} attempt {attempt + 1} failed ({error}); retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+    async def generate(self, model: str, contents, limiter=None, config=None):
+        """Calls generate_content, retrying throttling and server errors."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._attempt(limiter):
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(model=model, contents=contents, config=config),
+                        timeout=self.timeout,
+                    )
+                self._record(model, response)
+                _feedback(limiter)
+                return response
+            except Exception as e:
+                _feedback(limiter, e)
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    self._record(model, failed=True)
+                    raise
+                await self._backoff(model, attempt, e)
+
+    async def generate_stream(self, model: str, contents, limiter=None, config=None):
+        """Yields response text chunks; retries only until the first chunk has been yielded."""
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                async with self._attempt(limiter):
+                    stream = await asyncio.wait_for(
+                        self.client.aio.models.generate_content_stream(model=model, contents=contents, config=config),
+                        timeout=self.timeout,
+                    )
+                    last = None
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), timeout=self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        last = chunk
+                        if chunk.text:
+                            started = True
+                            yield chunk.text
+                # The final chunk carries the usage totals for the whole stream
+                self._record(model, last)
+                _feedback(limiter)
+                return
+            except Exception as e:
+                _feedback(limiter, e)
+                if started or attempt >= self.max_retries or not _is_retryable(e):
+                    self._record(model, failed=True)
+                    raise
+                await self._backoff(model, attempt, e)
+
+    @staticmethod
+    def image_part(data: bytes, mime_type: str = "image/jpeg"):
+        """Image bytes as an inline prompt part: no upload round-trip, nothing written to disk."""
+        from google.genai import types
+        return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+    def usage(self) -> dict:
+        return {model: dict(usage) for model, usage in self.usage_by_model.items()}
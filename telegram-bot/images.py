@@ -0,0 +1,167 @@
+import io
+import os
+import hashlib
+from collections import OrderedDict
+
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "2000"))
+# Photos with fewer text-like cells than this are taken to have no text (0 = always run OCR)
+TEXT_PRESENCE_MIN = int(os.getenv("TEXT_PRESENCE_MIN", "3"))
+# Tesseract output is used as-is at this mean word confidence (0-100) or above; below, Gemini reads it
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "80"))
+OCR_MIN_WORDS = int(os.getenv("OCR_MIN_WORDS", "3"))
+# Bounds for images sent to Gemini; larger ones are downscaled and recompressed as JPEG
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1600"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", "1000000"))
+
+_CELL = 16
+_tesseract = None  # pytesseract module once found to work, False if it is missing
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of the image bytes: the cache key for results of analysing that exact image."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _textlike_cells(pixels) -> int:
+    import numpy as np
+
+    rows, cols = pixels.shape[0] // _CELL, pixels.shape[1] // _CELL
+    if rows == 0 or cols < 2:
+        return 0
+    cells = pixels[:rows * _CELL, :cols * _CELL].reshape(rows, _CELL, cols, _CELL).transpose(0, 2, 1, 3)
+    low, high = cells.min(axis=(2, 3)), cells.max(axis=(2, 3))
+    binary = cells > ((low + high) // 2)[..., None, None]
+    across = np.count_nonzero(binary[..., :, 1:] != binary[..., :, :-1], axis=(2, 3)) / _CELL
+    down = np.count_nonzero(binary[..., 1:, :] != binary[..., :-1, :], axis=(2, 3)) / _CELL
+    textlike = (high - low >= 96) & (across >= 2) & (down >= 1)
+    # Text comes in lines: only count cells with a text-like neighbour to the left or right
+    neighbour = np.zeros_like(textlike)
+    neighbour[:, 1:] |= textlike[:, :-1]
+    neighbour[:, :-1] |= textlike[:, 1:]
+    return int(np.count_nonzero(textlike & neighbour))
+
+
+def text_presence(data: bytes, width: int = 640) -> int:
+    """Counts 16x16 cells that look like part of a line of text; a cheap check before any OCR.
+
+    A cell is text-like when it has strong contrast and its strokes cross the cell's
+    midtone several times across and at least once down. The image is checked at a few
+    scales so both captions and large headline type fit the cell. Smooth photos score
+    zero to a few, a short caption three or more, a line of headline text well over ten.
+    Busy drawings and fine texture can score as high as short captions, so the threshold
+    is kept low: a wrong guess costs an OCR call, not a missed claim.
+    """
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("L", (width, width))
+        gray = image.convert("L")
+    if gray.width > width:
+        gray = gray.resize((width, max(1, gray.height * width // gray.width)), Image.BILINEAR)
+    best = 0
+    while gray.width >= _CELL * 8:
+        best = max(best, _textlike_cells(np.asarray(gray, dtype=np.int16)))
+        gray = gray.resize((gray.width // 2, max(1, gray.height // 2)), Image.BILINEAR)
+    return best
+
+
+def local_ocr(data: bytes):
+    """Tesseract OCR: (text, mean word confidence 0-100), or None when pytesseract or tesseract is missing."""
+    global _tesseract
+    if _tesseract is None:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _tesseract = pytesseract
+        except Exception:
+            _tesseract = False
+    if not _tesseract:
+        return None
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        gray = image.convert("L")
+    if gray.width < 1000:
+        # Tesseract is most accurate with capital letters around 30px tall
+        gray = gray.resize((gray.width * 2, gray.height * 2), Image.LANCZOS)
+    words = _tesseract.image_to_data(gray, output_type=_tesseract.Output.DICT)
+
+    lines, confidences = {}, []
+    for i, word in enumerate(words["text"]):
+        confidence = float(words["conf"][i])
+        if not word.strip() or confidence < 0:
+            continue
+        line = (words["block_num"][i], words["par_num"][i], words["line_num"][i])
+        lines.setdefault(line, []).append(word.strip())
+        confidences.append(confidence)
+    if not confidences:
+        return "", 0.0
+    text = "\n".join(" ".join(line) for line in lines.values())
+    return text, sum(confidences) / len(confidences)
+
+
+def prepare_upload(data: bytes, max_side: int = IMAGE_MAX_SIDE, max_bytes: int = IMAGE_MAX_BYTES):
+    """Returns (bytes, mime type) for an image within the size bounds; images already inside them pass through."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        if len(data) <= max_bytes and max(image.size) <= max_side:
+            return data, Image.MIME.get(image.format, "image/jpeg")
+        image.draft("RGB", (max_side, max_side))
+        resized = image.convert("RGB")
+    resized.thumbnail((max_side, max_side), Image.LANCZOS)
+    for quality in (85, 70, 55):
+        out = io.BytesIO()
+        resized.save(out, "JPEG", quality=quality, optimize=True)
+        if out.tell() <= max_bytes:
+            break
+    return out.getvalue(), "image/jpeg"
+
+
+class ImageResultCache:
+    """Results of image analyses (OCR text, deepfake report) keyed by a hash of the image bytes.
+
+    A Telegram file_unique_id is mapped to its hash as well, so a forwarded photo that was
+    already seen is answered without even downloading it. Matching is exact on purpose:
+    headline screenshots on one template, or a photo with a small local edit, look the
+    same to a perceptual hash but need their own OCR text or deepfake verdict.
+    """
+
+    def __init__(self, max_entries: int = IMAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.results = OrderedDict()  # (kind, hash) -> result
+        self.hashes = OrderedDict()  # file_unique_id -> hash
+        self.hits = 0
+        self.misses = 0
+
+    def hash_for(self, file_id: str):
+        return self.hashes.get(file_id)
+
+    def remember_hash(self, file_id: str, image_hash: str):
+        self.hashes[file_id] = image_hash
+        self.hashes.move_to_end(file_id)
+        while len(self.hashes) > self.max_entries:
+            self.hashes.popitem(last=False)
+
+    def get(self, kind: str, image_hash: str):
+        result = self.results.get((kind, image_hash))
+        if result is None:
+            self.misses += 1
+            return None
+        self.results.move_to_end((kind, image_hash))
+        self.hits += 1
+        return result
+
+    def put(self, kind: str, image_hash: str, result):
+        self.results[(kind, image_hash)] = result
+        self.results.move_to_end((kind, image_hash))
+        while len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.results),
+        }
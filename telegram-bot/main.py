@@ -1,19 +1,37 @@
+from __future__ import annotations  # telegram types in handler annotations are imported for type checkers only
 import os
+import time
+import threading
 import traceback
 from datetime import datetime
+from typing import TYPE_CHECKING
 import asyncio
-import httpx
-import trafilatura
+import json
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
-from google import genai
-from googleapiclient.discovery import build
-from transformers import pipeline
-import torch
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import sys  # Add this import at the top of your file
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+import uvicorn
+from http_client import close_http_client, pool_stats
+from content_cache import content_cache
+from scraper import fetch_page_text, download_stats, page_flights, scrape_quorum, quorum_for, SCRAPE_OVERFETCH
+from extractor import shutdown_extractor
+from verdict_cache import VerdictCache, normalize_claim
+from search_client import SearchClient
+from gemini_client import GeminiClient
+from extractive import select_passages, split_sentences, summarize_sources
+from models import SearchHit, SourceDocument, Verdict
+from verdict_batcher import VerdictBatcher
+from singleflight import SingleFlight
+from adaptive_limiter import AdaptiveLimiter, GEMINI_RPM, SEARCH_RPM
+from batch import BatchCheckpoint, parse_claims, run_batch
+from metrics import metrics, new_trace, record_failure, span, timed
+
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import ContextTypes
 
 # Load environment variables
 load_dotenv('.env')
@@ -22,213 +40,421 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
 
-# Initialize Gemini
-genai_client = genai.Client(api_key=GEMINI_API_KEY)
-genai_client.generation_config = genai.types.GenerationConfig(
-    response_mime_type="text/plain"
-)
-
-# Initialize summarizer once at startup
-try:
-    print("Initializing text summarizer...")
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=0 if torch.cuda.is_available() else -1)
-except Exception as e:
-    print(f"Error during initialization: {e}")
-    sys.exit(1)  # Exit the program with a non-zero status code
-
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-
-@app.route('/api/analyze', methods=['POST'])
-def analyze_claim():
-    data = request.json
-    claim = data.get('claim', '')
+# Initialize Gemini (async client with bounded concurrency, timeouts and retries)
+gemini = GeminiClient(GEMINI_API_KEY)
+
+# STARTUP_MODE controls the optional BART summarizer (torch + transformers, slow and large):
+#   lite - never load it (default; sources are condensed by extractive.summarize_sources)
+#   lazy - load it the first time get_summarizer() is called
+#   full - load it in the background at startup; /readyz reports ready once it is loaded
+STARTUP_MODE = os.getenv("STARTUP_MODE", "lite")
+summarizer = None
+summarizer_error = None
+summarizer_lock = threading.Lock()
+
+def get_summarizer():
+    """Returns the summarization pipeline, loading it on first use (None in lite mode or on error)"""
+    global summarizer, summarizer_error
+    if STARTUP_MODE == "lite":
+        return None
+    with summarizer_lock:
+        if summarizer is None and summarizer_error is None:
+            try:
+                print("Initializing text summarizer...")
+                from transformers import pipeline
+                import torch
+                summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=0 if torch.cuda.is_available() else -1)
+            except Exception as e:
+                print(f"Error during summarizer initialization: {e}")
+                summarizer_error = str(e)
+    return summarizer
+
+# Adaptive rate limiters: back off on 429/quota errors, shared with the Telegram bot via SQLite
+gemini_limiter = AdaptiveLimiter("gemini", GEMINI_RPM)
+search_limiter = AdaptiveLimiter("google_search", SEARCH_RPM)
+
+# Built once; searches go over the shared HTTP pool and are cached per query
+search_client = SearchClient(GOOGLE_API_KEY, GOOGLE_CSE_ID, limiter=search_limiter)
+
+# Repeat claims are answered from here instead of re-running search + Gemini
+verdict_cache = VerdictCache()
+claim_flights = SingleFlight()
+
+# Set RUN_TELEGRAM_BOT=1 to poll Telegram from the API process (shares clients and caches)
+RUN_TELEGRAM_BOT = os.getenv("RUN_TELEGRAM_BOT", "0") == "1"
+
+model_task = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global model_task
+    if STARTUP_MODE == "full":
+        # Load in a thread so health checks answer while the model is still loading
+        model_task = asyncio.create_task(asyncio.to_thread(get_summarizer))
+
+    telegram_app = None
+    if RUN_TELEGRAM_BOT:
+        telegram_app = build_bot()
+        await telegram_app.initialize()
+        await telegram_app.start()
+        await telegram_app.updater.start_polling(drop_pending_updates=True)
+        print("Fact Checker Bot is running alongside the API...")
+    try:
+        yield
+    finally:
+        if telegram_app is not None:
+            await telegram_app.updater.stop()
+            await telegram_app.stop()
+            await telegram_app.shutdown()
+        await close_http_client()
+        shutdown_extractor()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+@app.get('/healthz')
+async def healthz():
+    """Liveness: the process is up and serving"""
+    return {'status': 'ok'}
+
+@app.get('/readyz')
+async def readyz():
+    """Readiness: startup work for the selected STARTUP_MODE has finished"""
+    if summarizer_error is not None:
+        return JSONResponse({'status': 'error', 'error': summarizer_error}, status_code=503)
+    if model_task is not None and not model_task.done():
+        return JSONResponse({'status': 'loading', 'mode': STARTUP_MODE}, status_code=503)
+    return {'status': 'ready', 'mode': STARTUP_MODE}
+
+class AnalyzeRequest(BaseModel):
+    claim: str = ""
+
+@app.post('/api/analyze')
+async def analyze_claim(data: AnalyzeRequest):
+    claim = data.claim
     # Ensure that the claim is not empty
     if not claim:
-        return jsonify({'error': 'Claim is required'}), 400
+        return JSONResponse({'error': 'Claim is required'}, status_code=400)
 
     # Call your existing analysis functions here
     try:
-        search_results = asyncio.run(get_search_results(claim))
-        analysis = asyncio.run(analyze_sources(claim, search_results))
-        return jsonify({'analysis': analysis})
+        verdict = await fact_check(claim)
+        return {'analysis': format_analysis(verdict)}
     except Exception as e:
         print(f"Error during analysis: {e}")
-        return jsonify({'error': 'An error occurred during analysis'}), 500
+        return JSONResponse({'error': 'An error occurred during analysis'}, status_code=500)
+
+@app.post('/api/analyze/stream')
+async def analyze_claim_stream(data: AnalyzeRequest):
+    """Server-Sent Events: progress updates, the verdict token by token, then the final analysis"""
+    claim = data.claim
+    if not claim:
+        return JSONResponse({'error': 'Claim is required'}, status_code=400)
+
+    async def events():
+        try:
+            async for event, payload in fact_check_stream(claim):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            print(f"Error during streamed analysis: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': 'An error occurred during analysis'})}\n\n"
 
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post('/api/analyze/batch')
+async def analyze_batch(request: Request, batch_id: str = "", format: str = ""):
+    """Fact-checks a JSONL or CSV body of claims, streaming one JSONL record per claim and a summary.
+
+    With ?batch_id=..., finished claims are checkpointed: posting the same batch again
+    replays them and only checks the rest.
+    """
+    body = (await request.body()).decode("utf-8", errors="replace")
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else None)
+    claims = parse_claims(body, fmt)
+    if not claims:
+        return JSONResponse({'error': 'No claims found; send JSONL or CSV with a claim per line'}, status_code=400)
+    try:
+        checkpoint = BatchCheckpoint.for_batch(batch_id) if batch_id else None
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    async def lines():
+        try:
+            async for record in run_batch(claims, get_search_results, analyze_sources,
+                                          cache=verdict_cache, checkpoint=checkpoint, replay=True):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"Error during batch analysis: {e}")
+            yield json.dumps({'error': 'An error occurred during batch analysis'}) + "\n"
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    """Stage latencies (p50/p95/p99), failure counters and component stats in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get('/api/stats')
+async def stats():
+    return {
+        'http_pool': pool_stats.snapshot(),
+        'verdict_cache': verdict_cache.stats(),
+        'content_cache': content_cache.stats(),
+        'downloads': download_stats.snapshot(),
+        'search': search_client.stats(),
+        'gemini': gemini.usage(),
+        'limiters': {'gemini': gemini_limiter.stats(), 'search': search_limiter.stats()},
+        'verdict_batches': verdict_batcher.stats(),
+        'coalescing': {
+            'claims': claim_flights.stats(),
+            'searches': search_client.flights.stats(),
+            'pages': page_flights.stats(),
+        },
+    }
+
+@timed("scrape")
 async def scrape_webpage(url: str) -> str:
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10)
-            text = trafilatura.extract(response.text)
-            
-            if text:
-                # Increased character limit to 4000
-                return text[:4000] if len(text) > 4000 else text
-            return ""
+        text = await fetch_page_text(url)
+
+        # Full text: claim-relevant sentences are selected later, across all sources at once
+        return text or ""
             
     except Exception as e:
         print(f"Error scraping {url}: {e}")
+        record_failure("scrape")
         return ""
 
 def chunk_text(text: str, max_chunk_size: int = 4000) -> list:
     """Split text into chunks of maximum size while preserving sentences"""
     chunks = []
-    current_chunk = ""
-    
-    # Split by sentences (roughly)
-    sentences = text.split('.')
-    
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) < max_chunk_size:
-            current_chunk += sentence + '.'
-        else:
-            if current_chunk:
-                chunks.append(current_chunk)
-            current_chunk = sentence + '.'
-    
-    if current_chunk:
-        chunks.append(current_chunk)
-        
+    current, current_size = [], 0
+
+    for sentence in split_sentences(text):
+        # +1 for the joining space
+        if current and current_size + len(sentence) + 1 > max_chunk_size:
+            chunks.append(" ".join(current))
+            current, current_size = [], 0
+        current.append(sentence)
+        current_size += len(sentence) + 1
+
+    if current:
+        chunks.append(" ".join(current))
+
     return chunks
 
-def summarize_text(text: str, max_length: int = 1000) -> str:
-    """Simple text summarization by keeping first part"""
-    if len(text) <= max_length:
-        return text
-        
-    # Find the last complete sentence within max_length
-    truncated = text[:max_length]
-    last_period = truncated.rfind('.')
-    if last_period > 0:
-        return truncated[:last_period + 1]
-    return truncated
-
-async def get_search_results(claim: str) -> str:
-    try:
-        print(f"\n=== Searching Google for: {claim} ===")
-        all_results = "Source Content:\n\n"
-        
-        try:
-            service = build(
-                "customsearch", "v1",
-                developerKey=GOOGLE_API_KEY
-            )
-            
-            # Get search results
-            search_results = service.cse().list(
-                q=f"{claim}",  # Expanded search query
-                cx=GOOGLE_CSE_ID,
-                num=4,
-                fields="items(title,link)"
-            ).execute()
-            
-            if 'items' in search_results:
-                urls = [item.get('link', '') for item in search_results['items']]
-                
-                print(f"Found {len(urls)} URLs to scrape:")
-                for url in urls:
-                    print(f"- {url}")
-                
-                # Scrape all URLs concurrently
-                scraping_tasks = [scrape_webpage(url) for url in urls]
-                contents = await asyncio.gather(*scraping_tasks, return_exceptions=True)
-                
-                successful_scrapes = 0
-                for i, (item, content) in enumerate(zip(search_results['items'], contents), 1):
-                    if isinstance(content, Exception) or not content:
-                        print(f"Failed to scrape source {i}")
-                        continue
-                    
-                    print(f"Successfully scraped source {i} with {len(content)} characters")
-                    title = item.get('title', '').replace('\n', ' ')
-                    source = item.get('link', '').split('//')[1].split('/')[0] if '//' in item.get('link', '') else item.get('link', '')
-                    
-                    all_results += f"\n=== Source {i}: [{source}] {title} ===\n"
-                    all_results += f"{content}\n"
-                    all_results += "\n---\n"
-                    successful_scrapes += 1
-            
-            print(f"Successfully processed {successful_scrapes} sources")
-            if successful_scrapes == 0:
-                return "Error: Could not retrieve any valid content from sources."
-                
-            return all_results if len(all_results) > 30 else "No relevant content found."
-            
-        except Exception as e:
-            print(f"Search error: {e}")
-            traceback.print_exc()
-            return f"Error performing search: {str(e)}"
-        
-    except Exception as e:
-        print(f"Critical error in search: {e}")
-        traceback.print_exc()
-        return "Error gathering results."
+@timed("search")
+async def get_search_results(claim: str, on_progress=None) -> list:
+    """Searches and scrapes sources for a claim; on_progress(stage, **info) gets stage updates.
 
-async def analyze_sources(claim: str, search_results: str) -> str:
-    try:
-        current_time = datetime.now().strftime("%B %d, %Y")
-        print(f"Starting source analysis for claim: {claim}")
-        
-        # Summarize if content is too large
-        if len(search_results) > 4000:
-            search_results = summarize_text(search_results, max_length=4000)
-            print("Summarized search results for analysis")
-        
-        prompt = (
-            f"Current Date: {current_time}\n\n"
-            f"Review these source contents regarding the following claim and provide a clear analysis.\n\n"
-            f"CLAIM: {claim}\n\n"
-            f"SOURCE CONTENTS:\n{search_results}\n\n"
-            f"INSTRUCTIONS:\n"
-            f"1. Carefully analyze what each source says about the specific claim\n"
-            f"2. Look for concrete evidence, numbers, and verifiable facts\n"
-            f"3. Compare information across sources\n"
-            f"4. Consider the reliability and recency of sources\n"
-            f"5. Based SOLELY on the available source content, provide a clear verdict\n\n"
-            f"FORMAT YOUR RESPONSE AS:\n"
-            f"VERDICT: Choose ONE of these options based on the evidence:\n"
-            f"- CONFIRMED (when multiple reliable sources clearly support the claim)\n"
-            f"- FALSE (when multiple reliable sources clearly contradict the claim)\n"
-            f"- PARTIALLY TRUE (when some aspects are true but others are not)\n"
-            f"- UNVERIFIABLE (ONLY if sources don't provide enough evidence)\n\n"
-            f"EVIDENCE:\n[20-30 words as a list of specific facts, numbers, and quotes from sources that support your verdict]\n\n"
-            f"SOURCE SUMMARY:\n[20 word summary of what each source says]\n\n"
-            f"Be decisive when evidence is clear. Choose UNVERIFIABLE only as a last resort when sources truly don't address the claim."
-        )
-        
-        print("Requesting Gemini analysis...")
-        response = genai_client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
-        
-        if not response:
-            return "Unable to analyze sources."
-
-        analysis = response.text.strip()
-        formatted_response = (
-            "📊 SOURCE ANALYSIS:\n\n" +
-            analysis.replace("VERDICT:", "📍 VERDICT:").
-            replace("EVIDENCE:", "\n📚 EVIDENCE:").
-            replace("SOURCE SUMMARY:", "\n📋 SOURCE SUMMARY:")
+    Returns the SourceDocuments that had content (empty if none did); search failures raise.
+    """
+    report = on_progress or (lambda stage, **info: None)
+    print(f"\n=== Searching Google for: {claim} ===")
+
+    # Get search results
+    with span("cse"):
+        search_results = await search_client.search(
+            claim, num=min(10, 4 + SCRAPE_OVERFETCH), fields="items(title,link)"
         )
-        
-        return formatted_response
+    hits = [SearchHit.from_item(i, item) for i, item in enumerate(search_results.get('items', []), 1)]
 
-    except Exception as e:
-        print(f"Error in analysis: {e}")
-        traceback.print_exc()
-        return "Error analyzing sources."
+    print(f"Found {len(hits)} URLs to scrape:")
+    for hit in hits:
+        print(f"- {hit.url}")
+    if not hits:
+        return []
+
+    # Scrape all URLs concurrently, moving on once a quorum has content
+    quorum = quorum_for(4)
+    report("scraping", total=quorum)
+    scraped = 0
+
+    def on_result(index, content):
+        nonlocal scraped
+        scraped += 1
+        report("scraped", done=scraped, total=quorum)
+
+    contents = await scrape_quorum([hit.url for hit in hits], scrape_webpage, quorum=quorum, on_result=on_result)
+
+    # Keep each source's best BM25 passages, then fit what's left to the token budget
+    contents = summarize_sources(claim, select_passages(claim, contents))
+
+    documents = []
+    for hit, content in zip(hits, contents):
+        if not content:
+            print(f"Failed to scrape source {hit.index}")
+            continue
+        print(f"Successfully scraped source {hit.index} with {len(content)} characters")
+        documents.append(SourceDocument(hit, content))
+
+    print(f"Successfully processed {len(documents)} sources")
+    return documents
+
+def format_sources(documents: list) -> str:
+    """The SOURCE CONTENTS block of the analysis prompt"""
+    parts = ["Source Content:\n\n"]
+    for document in documents:
+        hit = document.hit
+        parts.append(f"\n=== Source {hit.index}: [{hit.domain}] {hit.title} ===\n{document.content}\n\n---\n")
+    return "".join(parts)
+
+def build_analysis_prompt(claim: str, documents: list) -> str:
+    current_time = datetime.now().strftime("%B %d, %Y")
+    return (
+        f"Current Date: {current_time}\n\n"
+        f"Review these source contents regarding the following claim and provide a clear analysis.\n\n"
+        f"CLAIM: {claim}\n\n"
+        f"SOURCE CONTENTS:\n{format_sources(documents)}\n\n"
+        f"INSTRUCTIONS:\n"
+        f"1. Carefully analyze what each source says about the specific claim\n"
+        f"2. Look for concrete evidence, numbers, and verifiable facts\n"
+        f"3. Compare information across sources\n"
+        f"4. Consider the reliability and recency of sources\n"
+        f"5. Based SOLELY on the available source content, provide a clear verdict\n\n"
+        f"FORMAT YOUR RESPONSE AS:\n"
+        f"VERDICT: Choose ONE of these options based on the evidence:\n"
+        f"- CONFIRMED (when multiple reliable sources clearly support the claim)\n"
+        f"- FALSE (when multiple reliable sources clearly contradict the claim)\n"
+        f"- PARTIALLY TRUE (when some aspects are true but others are not)\n"
+        f"- UNVERIFIABLE (ONLY if sources don't provide enough evidence)\n\n"
+        f"EVIDENCE:\n[20-30 words as a list of specific facts, numbers, and quotes from sources that support your verdict]\n\n"
+        f"SOURCE SUMMARY:\n[20 word summary of what each source says]\n\n"
+        f"Be decisive when evidence is clear. Choose UNVERIFIABLE only as a last resort when sources truly don't address the claim."
+    )
+
+def format_analysis(verdict: Verdict) -> str:
+    """Renders a verdict as the user-facing message"""
+    if not verdict.structured:
+        # The model ignored the section format; show its answer as-is
+        return f"📊 SOURCE ANALYSIS:\n\n{verdict.text}"
+    sections = [f"📍 VERDICT: {verdict.label}"]
+    if verdict.evidence:
+        sections.append(f"📚 EVIDENCE:\n{verdict.evidence}")
+    if verdict.source_summary:
+        sections.append(f"📋 SOURCE SUMMARY:\n{verdict.source_summary}")
+    if verdict.conclusion:
+        sections.append(f"📝 CONCLUSION:\n{verdict.conclusion}")
+    return "📊 SOURCE ANALYSIS:\n\n" + "\n\n".join(sections)
+
+def no_sources_verdict(claim: str) -> Verdict:
+    return Verdict(claim, conclusion="Could not retrieve any relevant content from sources for this claim.")
+
+async def analyze_single(claim: str, documents: list) -> Verdict:
+    print(f"Starting source analysis for claim: {claim}")
+    prompt = build_analysis_prompt(claim, documents)
+
+    print("Requesting Gemini analysis...")
+    response = await gemini.generate("gemini-2.0-flash", prompt, limiter=gemini_limiter)
+    if not response or not response.text:
+        raise ValueError("Gemini returned an empty analysis")
+
+    return Verdict.parse(claim, response.text, [document.hit for document in documents])
+
+# Off unless VERDICT_BATCH_WAIT > 0: then claims analyzed at the same moment share one Gemini call
+verdict_batcher = VerdictBatcher(gemini, "gemini-2.0-flash", format_sources, analyze_single, limiter=gemini_limiter)
+
+# Component stats exported on /metrics next to the stage timings
+metrics.register("http_pool", pool_stats.snapshot)
+metrics.register("verdict_cache", verdict_cache.stats)
+metrics.register("content_cache", content_cache.stats)
+metrics.register("downloads", download_stats.snapshot)
+metrics.register("search", search_client.stats)
+metrics.register("gemini", gemini.usage, label="model")
+metrics.register("limiter", lambda: {"gemini": gemini_limiter.stats(), "google_search": search_limiter.stats()},
+                 label="limiter")
+metrics.register("verdict_batches", verdict_batcher.stats)
+metrics.register("coalescing", lambda: {
+    "claims": claim_flights.stats(), "searches": search_client.flights.stats(), "pages": page_flights.stats(),
+}, label="kind")
+
+@timed("analyze")
+async def analyze_sources(claim: str, documents: list) -> Verdict:
+    if not documents:
+        return no_sources_verdict(claim)
+    return await verdict_batcher.submit(claim, documents)
+
+async def stream_analysis(claim: str, documents: list):
+    """Yields the raw Gemini verdict text chunk by chunk as it is generated"""
+    prompt = build_analysis_prompt(claim, documents)
+    print("Requesting streamed Gemini analysis...")
+    async for text in gemini.generate_stream("gemini-2.0-flash", prompt, limiter=gemini_limiter):
+        yield text
+
+async def fact_check(claim: str) -> Verdict:
+    """Runs search + analysis for a claim, answering repeats from the verdict cache"""
+    new_trace()
+    cached = verdict_cache.get(claim)
+    if cached:
+        print(f"Verdict cache hit for claim: {claim}")
+        return cached
+
+    # Identical claims already being checked share that run instead of starting another
+    return await claim_flights.run(normalize_claim(claim), lambda: run_fact_check(claim))
+
+async def run_fact_check(claim: str) -> Verdict:
+    started = time.perf_counter()
+    documents = await get_search_results(claim)
+    verdict = await analyze_sources(claim, documents)
+
+    # Only cache verdicts that were backed by sources
+    if verdict.sources:
+        verdict_cache.put(claim, verdict, time.perf_counter() - started)
+    return verdict
+
+async def fact_check_stream(claim: str):
+    """Streaming fact_check: yields (event, payload) pairs for progress, tokens and the result"""
+    new_trace()
+    cached = verdict_cache.get(claim)
+    if cached:
+        yield "done", {"analysis": format_analysis(cached), "cached": True}
+        return
+
+    started = time.perf_counter()
+    yield "progress", {"stage": "searching"}
+
+    # Stage updates from the search task are relayed through a queue; None marks the end
+    updates = asyncio.Queue()
+    search_task = asyncio.create_task(get_search_results(
+        claim, on_progress=lambda stage, **info: updates.put_nowait({"stage": stage, **info})
+    ))
+    search_task.add_done_callback(lambda _: updates.put_nowait(None))
+    try:
+        while (item := await updates.get()) is not None:
+            yield "progress", item
+    finally:
+        search_task.cancel()
+    documents = search_task.result()
+    if not documents:
+        yield "done", {"analysis": format_analysis(no_sources_verdict(claim))}
+        return
+
+    yield "progress", {"stage": "analyzing"}
+    parts = []
+    with span("analyze"):
+        async for text in stream_analysis(claim, documents):
+            parts.append(text)
+            yield "token", {"text": text}
+
+    verdict = Verdict.parse(claim, "".join(parts), [document.hit for document in documents])
+    if parts:
+        verdict_cache.put(claim, verdict, time.perf_counter() - started)
+    yield "done", {"analysis": format_analysis(verdict)}
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         claim = update.message.text
         await update.message.reply_text("🔍 Gathering information from sources... Please wait.")
 
-        search_results = await get_search_results(claim)
-        analysis = await analyze_sources(claim, search_results)
-        await update.message.reply_text(analysis)
+        verdict = await fact_check(claim)
+        await update.message.reply_text(format_analysis(verdict))
 
     except Exception as e:
         print(f"Error in handle_message: {e}")
@@ -254,17 +480,24 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
     await update.message.reply_text(help_text)
 
+async def shutdown(application) -> None:
+    await close_http_client()
+    shutdown_extractor()
+
+def build_bot():
+    from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
+    bot = ApplicationBuilder().token(TELEGRAM_API_KEY).post_shutdown(shutdown).build()
+    bot.add_handler(CommandHandler("start", start))
+    bot.add_handler(CommandHandler("help", help_command))
+    bot.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    return bot
+
 def main():
     try:
-        app = ApplicationBuilder().token(TELEGRAM_API_KEY).build()
-        app.add_handler(CommandHandler("start", start))
-        app.add_handler(CommandHandler("help", help_command))
-        app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-
         print("Fact Checker Bot is running...")
-        app.run_polling(drop_pending_updates=True)
+        build_bot().run_polling(drop_pending_updates=True)
     except Exception as e:
         print(f"Bot error: {e}")
 
 if __name__ == "__main__":
-    app.run(port=5000)  # Ensure this port is not in use
+    uvicorn.run(app, host="0.0.0.0", port=5000)  # Ensure this port is not in use
@@ -0,0 +1,206 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))  # latest samples per series behind p50/p95/p99
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "0"))  # bot: seconds between metric dumps, 0 = off
+
+_PREFIX = "factcheck_"
+_QUANTILES = (0.5, 0.95, 0.99)
+
+_trace_id = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace(trace_id: str = None) -> str:
+    """Starts (or, given an id, resumes) the trace for one claim or image; tasks created after this inherit it."""
+    trace_id = trace_id or uuid.uuid4().hex[:12]
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def current_trace() -> str:
+    return _trace_id.get()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    """Latency summaries (p50/p95/p99 over a sliding window), counters and stats() collectors.
+
+    Summaries and counters are keyed by name and a tuple of label pairs. Components that
+    already keep a stats() dict (caches, limiters, the search client) are registered as
+    collectors and read when /metrics is rendered instead of being counted twice.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+        self.samples = {}  # (name, labels) -> deque of recent values
+        self.sums = {}  # (name, labels) -> [count, total] since start
+        self.counters = {}  # (name, labels) -> value
+        self.help = {}
+        self.collectors = []  # (prefix, stats callable, label name or None)
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(labels.items()))
+        samples = self.samples.get(key)
+        if samples is None:
+            samples = self.samples[key] = deque(maxlen=self.window)
+            self.sums[key] = [0, 0.0]
+        samples.append(value)
+        self.sums[key][0] += 1
+        self.sums[key][1] += value
+
+    def count(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(labels.items()))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def describe(self, name: str, text: str):
+        self.help[name] = text
+
+    def register(self, prefix: str, stats, label: str = None):
+        """Exports the numbers in stats() as gauges named <prefix>_<key> (and in snapshots).
+
+        With label, stats() returns {label value: {key: number}} (e.g. usage per model).
+        """
+        self.collectors.append((prefix, stats, label))
+
+    def snapshot(self) -> dict:
+        """Percentiles per series, counters and collector stats, for logging."""
+        series = {}
+        for (name, labels), samples in self.samples.items():
+            ordered = sorted(samples)
+            tag = name + "".join(f" {key}={value}" for key, value in labels)
+            series[tag] = {
+                "count": self.sums[(name, labels)][0],
+                **{f"p{int(q * 100)}": round(_percentile(ordered, q), 3) for q in _QUANTILES},
+            }
+        counters = {
+            name + "".join(f" {key}={value}" for key, value in labels): value
+            for (name, labels), value in self.counters.items()
+        }
+        stats = {}
+        for prefix, collect, _ in self.collectors:
+            try:
+                stats[prefix] = collect()
+            except Exception as e:
+                stats[prefix] = f"unavailable: {e}"
+        return {"latency": series, "counters": counters, "stats": stats}
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        by_name = {}
+        for name, labels in self.samples:
+            by_name.setdefault(name, []).append(labels)
+        for name, series in by_name.items():
+            metric = _PREFIX + name
+            if name in self.help:
+                lines.append(f"# HELP {metric} {self.help[name]}")
+            lines.append(f"# TYPE {metric} summary")
+            for labels in series:
+                ordered = sorted(self.samples[(name, labels)])
+                count, total = self.sums[(name, labels)]
+                for q in _QUANTILES:
+                    lines.append(f"{metric}{_labels(dict(labels, quantile=q))} {_percentile(ordered, q):.6g}")
+                lines.append(f"{metric}_sum{_labels(dict(labels))} {total:.6g}")
+                lines.append(f"{metric}_count{_labels(dict(labels))} {count}")
+
+        by_name = {}
+        for name, labels in self.counters:
+            by_name.setdefault(name, []).append(labels)
+        for name, series in by_name.items():
+            metric = _PREFIX + name
+            if name in self.help:
+                lines.append(f"# HELP {metric} {self.help[name]}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels in series:
+                lines.append(f"{metric}{_labels(dict(labels))} {self.counters[(name, labels)]:.6g}")
+
+        for prefix, stats, label in self.collectors:
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"Metrics collector {prefix} failed: {e}")
+                continue
+            groups = values.items() if label else [(None, values)]
+            families = {}  # every sample of a metric has to be listed together
+            for label_value, group in groups:
+                for key, value in group.items():
+                    if isinstance(value, bool):
+                        value = int(value)
+                    if not isinstance(value, (int, float)):
+                        continue
+                    labels = {label: label_value} if label else {}
+                    families.setdefault(f"{_PREFIX}{prefix}_{key}", []).append(f"{_labels(labels)} {value:.6g}")
+            for metric, samples in families.items():
+                lines.append(f"# TYPE {metric} gauge")
+                lines.extend(metric + sample for sample in samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("stage_seconds", "Time spent per pipeline stage")
+metrics.describe("stage_failures_total", "Pipeline stage calls that failed")
+metrics.describe("limiter_wait_seconds", "Time spent waiting for a rate-limiter slot")
+
+
+def record_failure(stage: str):
+    """For stages that catch their own errors and return a fallback instead of raising."""
+    metrics.count("stage_failures_total", stage=stage)
+    logger.debug(f"trace={current_trace()} stage={stage} failed")
+
+
+@contextmanager
+def span(stage: str):
+    """Times a block as one stage of the current trace; an exception out of it counts as a failure."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.observe("stage_seconds", seconds, stage=stage)
+        if failed:
+            metrics.count("stage_failures_total", stage=stage)
+        logger.debug(f"trace={current_trace()} stage={stage} ms={seconds * 1000:.0f}{' failed' if failed else ''}")
+
+
+def timed(stage: str):
+    """Decorator: runs an async function inside span(stage)."""
+    def decorate(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with span(stage):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+async def log_periodically(interval: float = METRICS_LOG_INTERVAL):
+    """Logs a metrics snapshot every interval seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"Metrics: {metrics.snapshot()}")
@@ -0,0 +1,91 @@
+import re
+from dataclasses import dataclass, field, asdict
+
+VERDICT_LABELS = ("CONFIRMED", "FALSE", "PARTIALLY TRUE", "UNVERIFIABLE")
+
+# Section headings of the analysis prompt's answer format, tolerating markdown bold/headers
+_SECTION = re.compile(
+    r"^[*#\s]*(VERDICT|EVIDENCE|SOURCE SUMMARY|RHETORIC ASSESSMENT|CONCLUSION)[*\s]*:[*\s]*",
+    re.MULTILINE,
+)
+_FIELDS = {
+    "EVIDENCE": "evidence",
+    "SOURCE SUMMARY": "source_summary",
+    "RHETORIC ASSESSMENT": "rhetoric",
+    "CONCLUSION": "conclusion",
+}
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """One Custom Search result; index is its 1-based position, used as the "Source N" label."""
+    index: int
+    title: str
+    url: str
+    snippet: str = ""
+
+    @classmethod
+    def from_item(cls, index: int, item: dict) -> "SearchHit":
+        return cls(
+            index=index,
+            title=item.get("title", "").replace("\n", " "),
+            url=item.get("link", ""),
+            snippet=item.get("snippet", "").replace("\n", " "),
+        )
+
+    @property
+    def domain(self) -> str:
+        return self.url.split("//")[1].split("/")[0] if "//" in self.url else self.url
+
+
+@dataclass(slots=True)
+class SourceDocument:
+    """A search hit with its (condensed) page text and any headline issues flagged for it."""
+    hit: SearchHit
+    content: str
+    rhetoric: str = ""
+
+
+@dataclass(slots=True)
+class Verdict:
+    """Gemini's assessment of one claim, split into the sections the prompt asks for."""
+    claim: str
+    label: str = "UNVERIFIABLE"
+    evidence: str = ""
+    source_summary: str = ""
+    rhetoric: str = ""
+    conclusion: str = ""
+    sources: list = field(default_factory=list)  # SearchHit
+    text: str = ""  # raw model output, kept for answers that ignore the section format
+
+    @classmethod
+    def parse(cls, claim: str, text: str, sources: list = ()) -> "Verdict":
+        """Builds a Verdict from the "VERDICT: / EVIDENCE: / ..." text the analysis prompt asks for."""
+        verdict = cls(claim=claim, sources=list(sources), text=text.strip())
+        matches = list(_SECTION.finditer(text))
+        for match, following in zip(matches, matches[1:] + [None]):
+            body = text[match.end():following.start() if following else len(text)].strip()
+            heading = match.group(1)
+            if heading == "VERDICT":
+                # The label the answer opens with, even if others are mentioned in its explanation
+                upper = body.upper()
+                found = [(upper.find(label), label) for label in VERDICT_LABELS if label in upper]
+                if found:
+                    verdict.label = min(found)[1]
+            else:
+                setattr(verdict, _FIELDS[heading], body)
+        return verdict
+
+    @property
+    def structured(self) -> bool:
+        """False when the model's answer had none of the expected sections."""
+        return bool(self.evidence or self.source_summary or self.conclusion)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Verdict":
+        data = dict(data)
+        data["sources"] = [SearchHit(**hit) for hit in data.get("sources", [])]
+        return cls(**data)
@@ -1,18 +1,33 @@
 import os
 import traceback
 import asyncio
-import httpx
-import trafilatura
 import logging
 import re
 import json
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-import google.generativeai as genai
-from googleapiclient.discovery import build
-from aiolimiter import AsyncLimiter
+from http_client import close_http_client
+from content_cache import content_cache
+from scraper import fetch_page_text, download_stats, page_flights, scrape_quorum, quorum_for, SCRAPE_OVERFETCH
+from extractor import shutdown_extractor
+from verdict_cache import VerdictCache, normalize_claim
+from search_client import SearchClient
+from gemini_client import GeminiClient
+from extractive import select_passages, summarize_sources
+from models import SearchHit, SourceDocument, Verdict
+from verdict_batcher import VerdictBatcher
+from singleflight import SingleFlight
+from admission import AdmissionController, Overloaded
+from rhetoric import detect_rhetoric_fast, RhetoricCache, RHETORIC_MODE
+from adaptive_limiter import AdaptiveLimiter, BACKGROUND, GEMINI_RPM, SEARCH_RPM
+from metrics import metrics, new_trace, record_failure, span, timed, log_periodically, METRICS_LOG_INTERVAL
+from images import (
+    content_hash, ImageResultCache, text_presence, local_ocr, prepare_upload,
+    TEXT_PRESENCE_MIN, OCR_MIN_CONFIDENCE, OCR_MIN_WORDS,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -28,65 +43,117 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
 
-# Initialize Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+# Initialize Gemini API (async client: bounded concurrency, timeouts, retries on 429/5xx)
+gemini = GeminiClient(GEMINI_API_KEY)
 
 # Use Gemini 1.5 Flash for image processing (faster, multimodal)
-gemini_vision_model = genai.GenerativeModel(model_name="gemini-1.5-flash")
+GEMINI_VISION_MODEL = "gemini-1.5-flash"
 
 # Use Gemini 2.0 Flash for text analysis (better for reasoning)
-gemini_text_model = genai.GenerativeModel(model_name="gemini-2.0-flash")
+GEMINI_TEXT_MODEL = "gemini-2.0-flash"
 
-# Create directories
-os.makedirs("images", exist_ok=True)
+# Adaptive rate limiters: back off on 429/quota errors, shared with the API server via SQLite
+gemini_limiter = AdaptiveLimiter("gemini", GEMINI_RPM)
+google_search_limiter = AdaptiveLimiter("google_search", SEARCH_RPM)
 
-# Adjust rate limiters to be very generous for hackathon demo
-gemini_limiter = AsyncLimiter(100, 60)  # 100 requests per minute (very generous)
-google_search_limiter = AsyncLimiter(50, 60)  # 50 requests per minute (very generous)
+# Built once at startup; applies google_search_limiter to every API call it makes
+search_client = SearchClient(GOOGLE_API_KEY, GOOGLE_CSE_ID, limiter=google_search_limiter)
 
-# Track which users are in deepfake mode
-user_modes = {}
+# Verdicts for recently checked claims (survives restarts)
+verdict_cache = VerdictCache()
 
-async def detect_rhetoric_fast(title, snippet, max_chars=300):
-    """Quick assessment of rhetoric in title and snippet."""
-    if not title and not snippet:
-        return ""
-        
-    text = f"{title} {snippet}"[:max_chars]
-    
-    # Simple regex-based checks for common patterns
-    patterns = {
-        "BREAKING": r'\b(?:BREAKING|URGENT)\b',
-        "Clickbait": r'\b(?:won\'t believe|shocking|mind-?blowing)\b',
-        "Hyperbole": r'\b(?:incredible|amazing|unbelievable|revolutionary|devastat|catastroph)\b',
-        "Emotional": r'\b(?:terrifying|horrific|alarming|outrage|anger|furious|hate)\b',
-    }
-    
-    warnings = []
-    for label, pattern in patterns.items():
-        if re.search(pattern, text, re.IGNORECASE):
-            warnings.append(f"⚠️ {label}")
-    
-    return " ".join(warnings)
+# Concurrent identical claims share one in-flight search/scrape stage and one verdict stage
+source_flights = SingleFlight()
+verdict_flights = SingleFlight()
 
-async def prep_image(image_path):
-    """Uploads image to Gemini API."""
-    try:
-        return genai.upload_file(path=image_path, display_name="Uploaded Image")
-    except Exception as e:
-        logger.error(f"Error uploading image: {e}")
-        raise
+# Headline rhetoric by hash of title + snippet; the same story shows up for many claims
+rhetoric_cache = RhetoricCache()
+
+# Track which users are in deepfake mode
+user_modes = {}
 
-async def extract_text_from_image(sample_file):
-    """Extracts text from an image using Gemini 1.5 Flash."""
+# Fair, bounded admission for messages and photos (per-user cap, round-robin, load shedding)
+admission = AdmissionController()
+# OCR text and deepfake reports by image content hash; concurrent copies of one image share a call
+image_cache = ImageResultCache()
+image_flights = SingleFlight()
+# Which OCR tier answered: no text found locally, Tesseract, or Gemini vision
+ocr_tiers = {"no_text": 0, "local": 0, "gemini": 0}
+
+def admitted(handler):
+    """Wraps a Telegram handler so it runs through the admission controller."""
+    async def run_admitted(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        async def on_queued(position):
+            await update.message.reply_text(f"⏳ The bot is busy - your request is #{position} in the queue.")
+
+        new_trace()  # one trace per message or photo, through every stage it triggers
+        try:
+            await admission.run(update.effective_user.id, lambda: handler(update, context), on_queued=on_queued)
+        except Overloaded as e:
+            logger.warning(f"Shed request from {update.effective_user.id}: {e}")
+            if e.per_user:
+                await update.message.reply_text("🚦 You have too many requests waiting. Please wait for those to finish.")
+            else:
+                await update.message.reply_text("🚦 The bot is overloaded right now. Please try again in a minute.")
+    return run_admitted
+
+async def analyze_photo(context: ContextTypes.DEFAULT_TYPE, photo, kind: str, analyze, cacheable):
+    """Runs analyze(image bytes) for a photo, reusing the result for the same image.
+
+    The photo is kept in memory; a file_unique_id seen before skips even the download.
+    """
+    image_hash = image_cache.hash_for(photo.file_unique_id)
+    data = None
+    if image_hash is None:
+        file = await context.bot.get_file(photo.file_id)
+        data = bytes(await file.download_as_bytearray())
+        image_hash = content_hash(data)
+        image_cache.remember_hash(photo.file_unique_id, image_hash)
+
+    cached = image_cache.get(kind, image_hash)
+    if cached is not None:
+        return cached
+
+    async def run():
+        image = data
+        if image is None:
+            # Hash known from an earlier copy whose result was not cacheable; fetch it again
+            file = await context.bot.get_file(photo.file_id)
+            image = bytes(await file.download_as_bytearray())
+        result = await analyze(image)
+        if cacheable(result):
+            image_cache.put(kind, image_hash, result)
+        return result
+
+    return await image_flights.run((kind, image_hash), run)
+
+@timed("ocr")
+async def extract_text_from_image(data: bytes):
+    """Extracts text from an image: local text check and Tesseract first, Gemini 1.5 Flash when unsure."""
     try:
-        async with gemini_limiter:
-            response = await asyncio.to_thread(gemini_vision_model.generate_content, 
-                [sample_file, "Extract the text in the image verbatim. Only return the exact text from the image."])
-            return response.text.strip() if response and response.text else ""
+        if await asyncio.to_thread(text_presence, data) < TEXT_PRESENCE_MIN:
+            ocr_tiers["no_text"] += 1
+            return ""
+        local = await asyncio.to_thread(local_ocr, data)
+        if local is not None:
+            text, confidence = local
+            if confidence >= OCR_MIN_CONFIDENCE and len(text.split()) >= OCR_MIN_WORDS:
+                ocr_tiers["local"] += 1
+                return text
+            logger.info(f"Local OCR unsure ({confidence:.0f}% over {len(text.split())} words); asking Gemini")
+
+        image, mime_type = await asyncio.to_thread(prepare_upload, data)
+        ocr_tiers["gemini"] += 1
+        response = await gemini.generate(
+            GEMINI_VISION_MODEL,
+            [gemini.image_part(image, mime_type), "Extract the text in the image verbatim. Only return the exact text from the image."],
+            limiter=gemini_limiter,
+        )
+        return response.text.strip() if response and response.text else ""
     except Exception as e:
         logger.error(f"Error extracting text from image: {e}")
         traceback.print_exc()
+        record_failure("ocr")
         return ""
 
 async def handle_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -105,12 +172,7 @@ async def process_image_for_factcheck(update: Update, context: ContextTypes.DEFA
     try:
         await update.message.reply_text("📷 Processing image... Please wait.")
         photo = update.message.photo[-1]
-        file = await context.bot.get_file(photo.file_id)
-        image_path = f"images/{photo.file_id}.jpg"
-        await file.download_to_drive(image_path)
-
-        sample_file = await prep_image(image_path)
-        extracted_text = await extract_text_from_image(sample_file)
+        extracted_text = await analyze_photo(context, photo, "ocr", extract_text_from_image, bool)
 
         if extracted_text:
             await update.message.reply_text(f"✅ Extracted Text:\n{extracted_text}\n\n🔍 Now fact-checking this content...")
@@ -136,12 +198,11 @@ async def process_image_for_deepfake(update: Update, context: ContextTypes.DEFAU
         )
         
         photo = update.message.photo[-1]
-        file = await context.bot.get_file(photo.file_id)
-        image_path = f"images/deepfake_{photo.file_id}.jpg"
-        await file.download_to_drive(image_path)
-        
-        # Run the deepfake analysis
-        analysis = await analyze_deepfake(image_path)
+
+        # Run the deepfake analysis (errors and "unable to analyze" replies are not cached)
+        analysis = await analyze_photo(
+            context, photo, "deepfake", analyze_deepfake, lambda result: result.startswith("📊")
+        )
         
         # Delete progress message and send the analysis
         await context.bot.delete_message(
@@ -156,37 +217,55 @@ async def process_image_for_deepfake(update: Update, context: ContextTypes.DEFAU
         traceback.print_exc()
         await update.message.reply_text(f"❌ Error analyzing image: {str(e)}")
 
-async def truncate_text(text, max_length=4000):
-    """Simple truncation for text that's too long."""
-    if not text or len(text) <= max_length:
-        return text
-    
-    # Take first 2000 chars + last 2000 chars (to get intro and conclusion)
-    first_part = text[:max_length//2]
-    last_part = text[-max_length//2:]
-    return first_part + "\n...[content truncated]...\n" + last_part
-
+@timed("scrape")
 async def scrape_webpage(url: str) -> str:
     """Scrapes text content from a webpage with minimal processing."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10)
-            text = trafilatura.extract(response.text)
-            
-            if not text:
-                return ""
-                
-            # Simple truncation instead of complex summarization
-            truncated_text = await truncate_text(text, 4000)
-            return truncated_text
+        # Pooled download + cached extraction (conditional GET once the entry is stale)
+        text = await fetch_page_text(url)
+
+        # Full text: claim-relevant sentences are selected later, across all sources at once
+        return text or ""
             
     except Exception as e:
         logger.error(f"Error scraping {url}: {e}")
         traceback.print_exc()
+        record_failure("scrape")
         return ""
 
+async def headline_rhetoric(hits: list) -> dict:
+    """Rhetoric issues per source index: cached, scored locally, or (when ambiguous) asked of Gemini."""
+    results, unseen = {}, []
+    for hit in hits:
+        cached = rhetoric_cache.get(hit.title, hit.snippet)
+        if cached is None:
+            unseen.append(hit)
+        else:
+            results[hit.index] = cached
+
+    ask = unseen
+    if RHETORIC_MODE != "llm":
+        ask = []
+        local = detect_rhetoric_fast([hit.title for hit in unseen])
+        for hit, (issues, ambiguous) in zip(unseen, local):
+            if ambiguous and RHETORIC_MODE == "hybrid":
+                ask.append(hit)
+                continue
+            results[hit.index] = ", ".join(issues)
+            rhetoric_cache.put(hit.title, hit.snippet, results[hit.index])
+
+    if ask:
+        answers = await analyze_title_sentiment([{"title": hit.title, "snippet": hit.snippet} for hit in ask])
+        for number, hit in enumerate(ask, 1):
+            results[hit.index] = (answers or {}).get(number, "")
+            if answers is not None:  # don't remember "no issues" for a call that failed
+                rhetoric_cache.put(hit.title, hit.snippet, results[hit.index])
+
+    return {index: issues for index, issues in results.items() if issues}
+
+@timed("title_sentiment")
 async def analyze_title_sentiment(titles_snippets):
-    """Let Gemini analyze the headlines for sentiment/rhetoric only."""
+    """Let Gemini analyze the headlines for sentiment/rhetoric only (None if the call failed)."""
     try:
         if not titles_snippets:
             return {}
@@ -209,12 +288,10 @@ async def analyze_title_sentiment(titles_snippets):
             f"etc."
         )
         
-        async with gemini_limiter:
-            response = await asyncio.to_thread(
-                lambda: gemini_text_model.generate_content(prompt)
-            )
-            
-        if response and hasattr(response, 'text'):
+        # Background priority: yields to verdict calls, and gives up quickly when the limiter is busy
+        response = await gemini.generate(GEMINI_TEXT_MODEL, prompt, limiter=gemini_limiter.slot(BACKGROUND))
+
+        if response and response.text:
             results = {}
             lines = response.text.strip().split('\n')
             for line in lines:
@@ -228,151 +305,151 @@ async def analyze_title_sentiment(titles_snippets):
                     except (ValueError, IndexError):
                         pass
             return results
-        return {}
+        return None
     except Exception as e:
         logger.error(f"Error analyzing headlines: {e}")
-        return {}
-
-async def get_search_results(claim: str) -> str:
-    """Fetches Google search results and scrapes content from sources."""
-    try:
-        logger.info(f"Searching Google for: {claim}")
-        all_results = "Source Content:\n\n"
-
-        async with google_search_limiter:
-            service = build("customsearch", "v1", developerKey=GOOGLE_API_KEY)
-            search_results = service.cse().list(
-                q=claim, cx=GOOGLE_CSE_ID, num=5, fields="items(title,link,snippet)"
-            ).execute()
-
-        if 'items' in search_results:
-            urls = [item.get('link', '') for item in search_results['items']]
-            logger.info(f"Found {len(urls)} URLs to scrape")
-            
-            # Prepare titles and snippets for sentiment analysis
-            titles_snippets = [
-                {"title": item.get('title', ''), "snippet": item.get('snippet', '')}
-                for item in search_results['items']
-            ]
-            
-            # Start sentiment analysis in parallel with content scraping
-            sentiment_task = asyncio.create_task(analyze_title_sentiment(titles_snippets))
-            
-            # Start content scraping
-            scraping_tasks = [scrape_webpage(url) for url in urls]
-            contents = await asyncio.gather(*scraping_tasks, return_exceptions=True)
-            
-            # Get sentiment results
-            headline_issues = await sentiment_task
-            
-            successful_scrapes = 0
-            for i, (item, content) in enumerate(zip(search_results['items'], contents), 1):
-                if isinstance(content, Exception) or not content:
-                    logger.warning(f"Failed to scrape source {i}: {item.get('link', '')}")
-                    continue
-
-                title = item.get('title', '').replace('\n', ' ')
-                source = item.get('link', '').split('//')[1].split('/')[0] if '//' in item.get('link', '') else item.get('link', '')
-                snippet = item.get('snippet', '').replace('\n', ' ')
-                
-                # Add any detected issues from headlines
-                rhetoric_info = ""
-                if i in headline_issues:
-                    rhetoric_info = f"⚠️ Rhetoric issues: {headline_issues[i]}\n"
-                
-                all_results += f"\n=== Source {i}: [{source}] {title} ===\n{rhetoric_info}Snippet: {snippet}\n\nContent:\n{content}\n---\n"
-                successful_scrapes += 1
-                
-            return all_results if successful_scrapes > 0 else "No relevant content found."
-        else:
-            return "No search results found."
-    except Exception as e:
-        logger.error(f"Search error: {e}")
-        traceback.print_exc()
-        return f"Error performing search: {str(e)}"
-
-async def analyze_sources(claim: str, search_results: str) -> str:
-    """Uses Gemini 2.0 Flash to analyze gathered sources and determine the truthfulness of a claim."""
-    try:
-        current_time = datetime.now().strftime("%B %d, %Y")
-        
-        # Enhanced prompt for better analysis with Gemini 2.0 Flash
-        prompt = (
-            f"Current Date: {current_time}\n\n"
-            f"Review these source contents regarding the following claim and provide a clear analysis.\n\n"
-            f"CLAIM: {claim}\n\n"
-            f"SOURCE CONTENTS:\n{search_results}\n\n"
-            f"INSTRUCTIONS:\n"
-            f"1. Carefully analyze what each source says about the specific claim\n"
-            f"2. Look for concrete evidence, numbers, and verifiable facts\n"
-            f"3. Compare information across sources\n"
-            f"4. Consider the reliability and recency of sources\n"
-            f"5. Based SOLELY on the available source content, provide a clear verdict\n"
-            f"6. If sources are dated before {current_time}, consider if information might be outdated\n"
-            f"7. Identify any conflicting information between sources\n"
-            f"8. Pay special attention to any RHETORIC ISSUES mentioned with sources\n"
-            f"9. Sources can present accurate facts despite emotional language\n"
-            f"10. Be especially skeptical when the ONLY supporting evidence comes from sources with rhetoric issues\n\n"
-            f"FORMAT YOUR RESPONSE AS:\n"
-            f"VERDICT: Choose ONE of these options based on the evidence:\n"
-            f"- CONFIRMED (when multiple reliable sources clearly support the claim)\n"
-            f"- FALSE (when multiple reliable sources clearly contradict the claim)\n"
-            f"- PARTIALLY TRUE (when some aspects are true but others are not)\n"
-            f"- UNVERIFIABLE (ONLY if sources don't provide enough evidence)\n\n"
-            f"EVIDENCE:\n[20-30 words as a list of specific facts, numbers, and quotes from sources that support your verdict]\n\n"
-            f"SOURCE SUMMARY:\n[20 word summary of what each source says]\n\n"
-            f"RHETORIC ASSESSMENT: [Briefly note if any sources show evidence of problematic language that affects reliability]\n\n"
-            f"CONCLUSION:\n[2-3 sentence final assessment that clearly explains your verdict]\n\n"
-            f"Be decisive when evidence is clear. Choose UNVERIFIABLE only as a last resort when sources truly don't address the claim."
+        record_failure("title_sentiment")
+        return None
+
+@timed("search")
+async def get_search_results(claim: str) -> list:
+    """Fetches Google search results and scrapes content from sources.
+
+    Returns a SourceDocument per source that had content (empty if none did); search failures raise.
+    """
+    logger.info(f"Searching Google for: {claim}")
+
+    # Over-fetch so slow or empty sources can be dropped without losing coverage (CSE max is 10)
+    num_results = min(10, 5 + SCRAPE_OVERFETCH)
+    with span("cse"):
+        search_results = await search_client.search(claim, num=num_results, fields="items(title,link,snippet)")
+    hits = [SearchHit.from_item(i, item) for i, item in enumerate(search_results.get('items', []), 1)]
+    if not hits:
+        return []
+    logger.info(f"Found {len(hits)} URLs to scrape")
+
+    # Start headline rhetoric analysis in parallel with content scraping
+    sentiment_task = asyncio.create_task(headline_rhetoric(hits))
+
+    # Start content scraping; analysis starts once a quorum of sources is in
+    contents = await scrape_quorum([hit.url for hit in hits], scrape_webpage, quorum=quorum_for(5))
+
+    # Keep each source's best BM25 passages, then fit what's left to the token budget
+    contents = summarize_sources(claim, select_passages(claim, contents))
+
+    # Get sentiment results
+    headline_issues = await sentiment_task
+
+    documents = []
+    for hit, content in zip(hits, contents):
+        if not content:
+            logger.warning(f"Failed to scrape source {hit.index}: {hit.url}")
+            continue
+        documents.append(SourceDocument(hit, content, rhetoric=headline_issues.get(hit.index, "")))
+    return documents
+
+def format_sources(documents: list) -> str:
+    """The SOURCE CONTENTS block of the analysis prompt."""
+    parts = ["Source Content:\n\n"]
+    for document in documents:
+        hit = document.hit
+        rhetoric_info = f"⚠️ Rhetoric issues: {document.rhetoric}\n" if document.rhetoric else ""
+        parts.append(
+            f"\n=== Source {hit.index}: [{hit.domain}] {hit.title} ===\n{rhetoric_info}"
+            f"Snippet: {hit.snippet}\n\nContent:\n{document.content}\n---\n"
         )
+    return "".join(parts)
+
+LABEL_EMOJI = {"CONFIRMED": "✅", "FALSE": "❌", "PARTIALLY TRUE": "⚠️", "UNVERIFIABLE": "❓"}
+
+def format_verdict(verdict: Verdict) -> str:
+    """Renders a verdict with emoji section markers for Telegram."""
+    if not verdict.structured:
+        # The model ignored the section format; show its answer as-is
+        return f"📊 **Fact Check Analysis:**\n\n{verdict.text}"
+    sections = [f"{LABEL_EMOJI[verdict.label]} VERDICT: {verdict.label}"]
+    if verdict.evidence:
+        sections.append(f"📊 EVIDENCE:\n{verdict.evidence}")
+    if verdict.source_summary:
+        sections.append(f"📚 SOURCE SUMMARY:\n{verdict.source_summary}")
+    if verdict.rhetoric:
+        sections.append(f"RHETORIC ASSESSMENT: {verdict.rhetoric}")
+    if verdict.conclusion:
+        sections.append(f"📝 CONCLUSION:\n{verdict.conclusion}")
+    return "📊 **Fact Check Analysis:**\n\n" + "\n\n".join(sections)
+
+async def analyze_single(claim: str, documents: list) -> Verdict:
+    """Uses Gemini 2.0 Flash to analyze gathered sources and determine the truthfulness of a claim."""
+    current_time = datetime.now().strftime("%B %d, %Y")
+    
+    # Enhanced prompt for better analysis with Gemini 2.0 Flash
+    prompt = (
+        f"Current Date: {current_time}\n\n"
+        f"Review these source contents regarding the following claim and provide a clear analysis.\n\n"
+        f"CLAIM: {claim}\n\n"
+        f"SOURCE CONTENTS:\n{format_sources(documents)}\n\n"
+        f"INSTRUCTIONS:\n"
+        f"1. Carefully analyze what each source says about the specific claim\n"
+        f"2. Look for concrete evidence, numbers, and verifiable facts\n"
+        f"3. Compare information across sources\n"
+        f"4. Consider the reliability and recency of sources\n"
+        f"5. Based SOLELY on the available source content, provide a clear verdict\n"
+        f"6. If sources are dated before {current_time}, consider if information might be outdated\n"
+        f"7. Identify any conflicting information between sources\n"
+        f"8. Pay special attention to any RHETORIC ISSUES mentioned with sources\n"
+        f"9. Sources can present accurate facts despite emotional language\n"
+        f"10. Be especially skeptical when the ONLY supporting evidence comes from sources with rhetoric issues\n\n"
+        f"FORMAT YOUR RESPONSE AS:\n"
+        f"VERDICT: Choose ONE of these options based on the evidence:\n"
+        f"- CONFIRMED (when multiple reliable sources clearly support the claim)\n"
+        f"- FALSE (when multiple reliable sources clearly contradict the claim)\n"
+        f"- PARTIALLY TRUE (when some aspects are true but others are not)\n"
+        f"- UNVERIFIABLE (ONLY if sources don't provide enough evidence)\n\n"
+        f"EVIDENCE:\n[20-30 words as a list of specific facts, numbers, and quotes from sources that support your verdict]\n\n"
+        f"SOURCE SUMMARY:\n[20 word summary of what each source says]\n\n"
+        f"RHETORIC ASSESSMENT: [Briefly note if any sources show evidence of problematic language that affects reliability]\n\n"
+        f"CONCLUSION:\n[2-3 sentence final assessment that clearly explains your verdict]\n\n"
+        f"Be decisive when evidence is clear. Choose UNVERIFIABLE only as a last resort when sources truly don't address the claim."
+    )
 
-        logger.info("Requesting Gemini 2.0 Flash analysis...")
-        
-        # Using rate limiter with Gemini API
-        async with gemini_limiter:
-            response = await asyncio.to_thread(
-                lambda: gemini_text_model.generate_content(prompt)
-            )
-
-        # Check if we got a valid response
-        if not response or not hasattr(response, 'text'):
-            logger.error("Invalid response from Gemini API")
-            return "⚠️ Unable to analyze sources due to an API error."
-
-        # Format the response with emoji for better readability
-        formatted_response = response.text.strip()
-        
-        # Add verdict highlighting with emojis
-        if "VERDICT: CONFIRMED" in formatted_response:
-            formatted_response = formatted_response.replace(
-                "VERDICT: CONFIRMED", 
-                "✅ VERDICT: CONFIRMED"
-            )
-        elif "VERDICT: FALSE" in formatted_response:
-            formatted_response = formatted_response.replace(
-                "VERDICT: FALSE", 
-                "❌ VERDICT: FALSE"
-            )
-        elif "VERDICT: PARTIALLY TRUE" in formatted_response:
-            formatted_response = formatted_response.replace(
-                "VERDICT: PARTIALLY TRUE", 
-                "⚠️ VERDICT: PARTIALLY TRUE"
-            )
-        elif "VERDICT: UNVERIFIABLE" in formatted_response:
-            formatted_response = formatted_response.replace(
-                "VERDICT: UNVERIFIABLE", 
-                "❓ VERDICT: UNVERIFIABLE"
-            )
-        
-        formatted_response = formatted_response.replace("EVIDENCE:", "📊 EVIDENCE:")
-        formatted_response = formatted_response.replace("SOURCE SUMMARY:", "📚 SOURCE SUMMARY:")
-        formatted_response = formatted_response.replace("CONCLUSION:", "📝 CONCLUSION:")
-        
-        return f"📊 **Fact Check Analysis:**\n\n{formatted_response}"
-    except Exception as e:
-        logger.error(f"Error in analysis: {e}")
-        traceback.print_exc()
-        return f"❌ Error analyzing sources: {str(e)}. Please try again later."
+    logger.info("Requesting Gemini 2.0 Flash analysis...")
+
+    # Using rate limiter with Gemini API
+    response = await gemini.generate(GEMINI_TEXT_MODEL, prompt, limiter=gemini_limiter)
+
+    # Check if we got a valid response
+    if not response or not response.text:
+        raise ValueError("Gemini returned an empty analysis")
+
+    return Verdict.parse(claim, response.text, [document.hit for document in documents])
+
+# Off unless VERDICT_BATCH_WAIT > 0: then claims from concurrent users share one Gemini call (and limiter slot)
+verdict_batcher = VerdictBatcher(gemini, GEMINI_TEXT_MODEL, format_sources, analyze_single, limiter=gemini_limiter)
+
+# Component stats included in the periodic metrics dump (METRICS_LOG_INTERVAL)
+metrics.register("verdict_cache", verdict_cache.stats)
+metrics.register("content_cache", content_cache.stats)
+metrics.register("search", search_client.stats)
+metrics.register("rhetoric_cache", rhetoric_cache.stats)
+metrics.register("image_cache", image_cache.stats)
+metrics.register("ocr_tiers", lambda: dict(ocr_tiers))
+metrics.register("admission", admission.stats)
+metrics.register("limiter", lambda: {"gemini": gemini_limiter.stats(), "google_search": google_search_limiter.stats()},
+                 label="limiter")
+
+@timed("analyze")
+async def analyze_sources(claim: str, documents: list) -> Verdict:
+    """Verdict for a claim from its sources, batched with other claims when VERDICT_BATCH_WAIT is set."""
+    if not documents:
+        return Verdict(claim, conclusion="No relevant content could be retrieved from sources for this claim.")
+    return await verdict_batcher.submit(claim, documents)
+
+async def analyze_and_cache(claim: str, documents: list, started: float) -> Verdict:
+    """Analyzes a claim's sources and caches the verdict if it was backed by sources."""
+    verdict = await analyze_sources(claim, documents)
+    if verdict.sources:
+        verdict_cache.put(claim, verdict, time.perf_counter() - started)
+    return verdict
 
 async def handle_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles URL submissions for fact-checking."""
@@ -402,9 +479,19 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE, cla
             await handle_url(update, context)
             return
 
+        cached = verdict_cache.get(claim)
+        if cached:
+            logger.info(f"Verdict cache hit for claim: {claim}")
+            await update.message.reply_text(format_verdict(cached))
+            return
+
+        started = time.perf_counter()
         progress_message = await update.message.reply_text("🔍 Gathering information from sources... Please wait.")
 
-        search_results = await get_search_results(claim)
+        # Search and API failures raise and are reported by the handler below.
+        # Users sending the same claim at the same time share each stage's in-flight work.
+        key = normalize_claim(claim)
+        documents = await source_flights.run(key, lambda: get_search_results(claim))
         
         # Update progress message
         await context.bot.edit_message_text(
@@ -413,15 +500,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE, cla
             text="📊 Analyzing sources and determining truthfulness..."
         )
         
-        analysis = await analyze_sources(claim, search_results)
-        
+        verdict = await verdict_flights.run(key, lambda: analyze_and_cache(claim, documents, started))
+
         # Delete progress message and send final analysis
         await context.bot.delete_message(
             chat_id=update.effective_chat.id,
             message_id=progress_message.message_id
         )
         
-        await update.message.reply_text(analysis)
+        await update.message.reply_text(format_verdict(verdict))
 
     except Exception as e:
         logger.error(f"Error in handle_message: {e}")
@@ -459,12 +546,12 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "I'll search for reliable sources and analyze the claim's accuracy."
     )
 
-async def analyze_deepfake(image_path):
+@timed("deepfake")
+async def analyze_deepfake(data: bytes):
     """Analyzes an image for signs of deepfake manipulation using Gemini 1.5 Flash."""
     try:
-        # Prepare the image for Gemini
-        sample_file = await prep_image(image_path)
-        
+        image, mime_type = await asyncio.to_thread(prepare_upload, data)
+
         # Deepfake detection prompt
         prompt = (
             "Analyze this image carefully for signs of manipulation, AI generation, or deepfake indicators. "
@@ -490,18 +577,14 @@ async def analyze_deepfake(image_path):
         )
         
         # Use Gemini Vision for analysis
-        async with gemini_limiter:
-            response = await asyncio.to_thread(
-                lambda: gemini_vision_model.generate_content([sample_file, prompt])
-            )
-            
-        if response and hasattr(response, 'text'):
+        response = await gemini.generate(GEMINI_VISION_MODEL, [gemini.image_part(image, mime_type), prompt], limiter=gemini_limiter)
+
+        if response and response.text:
             result = response.text.strip()
             
             # Format the response with emojis
             if "DEEPFAKE LIKELIHOOD:" in result:
                 # Try to extract the score
-                import re
                 match = re.search(r"DEEPFAKE LIKELIHOOD:\s*(\d+)", result)
                 if match:
                     score = int(match.group(1))
@@ -520,6 +603,7 @@ async def analyze_deepfake(image_path):
     except Exception as e:
         logger.error(f"Error analyzing deepfake: {e}")
         traceback.print_exc()
+        record_failure("deepfake")
         return f"❌ Error analyzing image: {str(e)}. Please try again later."
 
 async def deepfake_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -557,15 +641,46 @@ async def normal_mode_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         "Send me any text, image, or URL to fact-check!"
     )
 
+async def start_metrics_log(application):
+    """Starts the periodic metrics dump when METRICS_LOG_INTERVAL is set."""
+    if METRICS_LOG_INTERVAL > 0:
+        application.bot_data["metrics_log"] = asyncio.create_task(log_periodically(METRICS_LOG_INTERVAL))
+
+async def shutdown(application):
+    """Releases shared clients when the bot stops."""
+    metrics_log = application.bot_data.pop("metrics_log", None)
+    if metrics_log is not None:
+        metrics_log.cancel()
+    await close_http_client()
+    shutdown_extractor()
+    logger.info(f"Verdict cache stats: {verdict_cache.stats()}")
+    logger.info(f"Content cache stats: {content_cache.stats()}")
+    logger.info(f"Download stats: {download_stats.snapshot()}")
+    logger.info(f"Search stats: {search_client.stats()}")
+    logger.info(f"Gemini usage: {gemini.usage()}")
+    logger.info(f"Verdict batch stats: {verdict_batcher.stats()}")
+    logger.info(f"Admission stats: {admission.stats()}")
+    logger.info(f"Rhetoric cache stats: {rhetoric_cache.stats()}")
+    logger.info(f"Image cache stats: {image_cache.stats()}, coalesced {image_flights.stats()}, OCR tiers {ocr_tiers}")
+    logger.info(f"Limiters: gemini {gemini_limiter.stats()}, search {google_search_limiter.stats()}")
+    logger.info(
+        f"Coalesced: sources {source_flights.stats()}, verdicts {verdict_flights.stats()}, "
+        f"searches {search_client.flights.stats()}, pages {page_flights.stats()}"
+    )
+    snapshot = metrics.snapshot()
+    logger.info(f"Stage latencies: {snapshot['latency']}, counters: {snapshot['counters']}")
+
 def main():
     """Main function to start the bot."""
-    app = Application.builder().token(TELEGRAM_API_KEY).build()
+    # Updates are handled concurrently; the admission controller bounds the actual work
+    app = (Application.builder().token(TELEGRAM_API_KEY).concurrent_updates(True)
+           .post_init(start_metrics_log).post_shutdown(shutdown).build())
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(CommandHandler("deepfake", deepfake_command))
     app.add_handler(CommandHandler("normal", normal_mode_command))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    app.add_handler(MessageHandler(filters.PHOTO, handle_image))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, admitted(handle_message)))
+    app.add_handler(MessageHandler(filters.PHOTO, admitted(handle_image)))
     
     logger.info("✅ Fact Checker Bot (Optimized) is running...")
     app.run_polling(drop_pending_updates=True)
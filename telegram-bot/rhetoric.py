@@ -0,0 +1,89 @@
+import os
+import re
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+# local  - regex scoring only; the verdict prompt's RHETORIC ASSESSMENT covers the rest
+# hybrid - regex first, Gemini only for headlines the regex finds ambiguous (default)
+# llm    - every headline goes to Gemini (the old behaviour)
+RHETORIC_MODE = os.getenv("RHETORIC_MODE", "hybrid")
+RHETORIC_CACHE_SIZE = int(os.getenv("RHETORIC_CACHE_SIZE", "5000"))
+
+# Clear-cut markers, named after the issues the Gemini headline pass reports
+_ISSUES = {
+    "Sensationalism": r"\b(?:BREAKING|URGENT)\b|\b(?:incredible|amazing|unbelievable|revolutionary|devastat|catastroph)",
+    "Clickbait": r"won't believe|\b(?:shocking|mind-?blowing)\b",
+    "Emotional manipulation": r"\b(?:terrifying|horrific|alarming|outrage|anger|furious|hate)\b",
+}
+# Cues that might be rhetoric or might be innocent: exclamations and loaded verbs. Quotes,
+# questions and capitals are left out; news headlines are full of them (NASA, "said", Why ...?)
+_CUES = r"!|\b(?:slams?|blasts?|destroys?|rips?|so-called|exposed?|epic)\b"
+
+_LABELS = list(_ISSUES)
+_COMBINED = re.compile(
+    "|".join(f"(?P<issue{i}>{pattern})" for i, pattern in enumerate(_ISSUES.values())) + f"|(?P<cue>{_CUES})",
+    re.IGNORECASE,
+)
+
+
+def detect_rhetoric_fast(headlines: list, max_chars: int = 300) -> list:
+    """Scores all headlines in one regex pass; returns (issues, ambiguous) per headline.
+
+    issues lists the clear-cut markers found. A headline with no clear marker but with a
+    cue (an exclamation, a loaded verb) is ambiguous and worth a closer look. Pass titles
+    only: snippets quote article text, where these words say little about the headline.
+    """
+    texts = [" ".join(headline[:max_chars].split()) for headline in headlines]
+    if not texts:
+        return []
+    # One scan over every headline; match offsets are mapped back with a vectorized search
+    joined = "\n".join(texts)
+    starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+    matches = list(_COMBINED.finditer(joined))
+    owners = np.searchsorted(starts, [m.start() for m in matches], side="right") - 1
+
+    issues = [[] for _ in texts]
+    cued = [False] * len(texts)
+    for owner, match in zip(owners.tolist(), matches):
+        if match.lastgroup == "cue":
+            cued[owner] = True
+        else:
+            label = _LABELS[int(match.lastgroup[len("issue"):])]
+            if label not in issues[owner]:
+                issues[owner].append(label)
+    return [(found, cue and not found) for found, cue in zip(issues, cued)]
+
+
+class RhetoricCache:
+    """LRU of headline -> issues string ("" for none), keyed by a hash of title and snippet."""
+
+    def __init__(self, max_entries: int = RHETORIC_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(title: str, snippet: str) -> str:
+        return hashlib.sha1(f"{title}\x00{snippet}".encode("utf-8")).hexdigest()
+
+    def get(self, title: str, snippet: str):
+        key = self._key(title, snippet)
+        issues = self.entries.get(key)
+        if issues is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return issues
+
+    def put(self, title: str, snippet: str, issues: str):
+        key = self._key(title, snippet)
+        self.entries[key] = issues
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
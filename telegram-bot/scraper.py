@@ -0,0 +1,229 @@
+import os
+import re
+import codecs
+import asyncio
+import logging
+from collections import OrderedDict
+from extractor import extract_text
+from http_client import get_http_client, HTTP_TIMEOUT_BUDGET
+from content_cache import content_cache, canonical_url, CachedPage
+from singleflight import SingleFlight
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Nothing past this many (decompressed) bytes of a page is downloaded or kept in memory
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(2 * 1024 * 1024)))
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Quorum scraping: analyze once this many sources have content (0 = every source asked for)...
+SCRAPE_QUORUM = int(os.getenv("SCRAPE_QUORUM", "0"))
+# ...or once this many seconds have passed and at least one source has content
+SCRAPE_SOFT_DEADLINE = float(os.getenv("SCRAPE_SOFT_DEADLINE", "5"))
+# Extra search results to request so slow or empty sources can be dropped
+SCRAPE_OVERFETCH = int(os.getenv("SCRAPE_OVERFETCH", "0"))
+# Start a second attempt for a URL that hasn't answered after this many seconds (0 = off)
+SCRAPE_HEDGE_AFTER = float(os.getenv("SCRAPE_HEDGE_AFTER", "0"))
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+class DownloadStats:
+    """Decompressed bytes read vs. read and thrown away past the cap, in total and for the most recent URLs."""
+
+    def __init__(self, keep: int = 500):
+        self.keep = keep
+        self.recent = OrderedDict()
+        self.bytes_fetched = 0
+        self.bytes_discarded = 0
+        self.truncated = 0
+        self.non_html = 0
+        self.hedged = 0
+        self.stragglers_cancelled = 0
+
+    def record(self, url: str, fetched: int, discarded: int, reason: str = None):
+        self.bytes_fetched += fetched
+        self.bytes_discarded += discarded
+        if reason == "truncated":
+            self.truncated += 1
+        elif reason == "non-html":
+            self.non_html += 1
+
+        self.recent[url] = {"fetched": fetched, "discarded": discarded, "reason": reason}
+        self.recent.move_to_end(url)
+        while len(self.recent) > self.keep:
+            self.recent.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "bytes_fetched": self.bytes_fetched,
+            "bytes_discarded": self.bytes_discarded,
+            "truncated_pages": self.truncated,
+            "non_html_aborted": self.non_html,
+            "hedged_retries": self.hedged,
+            "stragglers_cancelled": self.stragglers_cancelled,
+        }
+
+
+download_stats = DownloadStats()
+
+
+def _charset(response, first_chunk: bytes) -> str:
+    """Charset from the Content-Type header, else a <meta> tag in the first chunk, else UTF-8."""
+    candidates = [response.charset_encoding]
+    match = _META_CHARSET.search(first_chunk[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii", errors="ignore"))
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+async def _download(url: str, headers: dict = None):
+    """Streams a page, stopping at SCRAPE_MAX_BYTES. Returns (status, headers, html or None)."""
+    async with get_http_client().stream(url, headers=headers) as response:
+        if response.status_code == 304:
+            return response.status_code, response.headers, None
+
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            # PDFs, images, video: nothing trafilatura can use, so don't read the body
+            download_stats.record(url, 0, 0, "non-html")
+            return response.status_code, response.headers, None
+
+        decoder = None
+        parts = []
+        fetched = 0
+        discarded = 0
+        reason = None
+        async for chunk in response.aiter_bytes():
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(_charset(response, chunk))(errors="replace")
+            room = SCRAPE_MAX_BYTES - fetched
+            fetched += len(chunk)
+            if len(chunk) >= room:
+                # A multi-byte character split at the cap stays buffered in the decoder and is dropped
+                parts.append(decoder.decode(chunk[:room]))
+                # Content-Length counts compressed bytes, so the unread rest of the body isn't counted
+                discarded = len(chunk) - room
+                reason = "truncated"
+                break
+            parts.append(decoder.decode(chunk))
+        else:
+            if decoder is not None:
+                parts.append(decoder.decode(b"", final=True))
+
+        download_stats.record(url, fetched, discarded, reason)
+        return response.status_code, response.headers, "".join(parts)
+
+
+# Concurrent fetches of the same page (by canonical URL) share one download and extraction
+page_flights = SingleFlight()
+
+
+async def fetch_page_text(url: str) -> str:
+    """Returns the main text of a page, skipping download and extraction when it is cached."""
+    cached = content_cache.get(url)
+    if cached is not None and cached.is_fresh():
+        content_cache.hits += 1
+        return cached.text
+    return await page_flights.run(canonical_url(url), lambda: _refresh_page(url, cached))
+
+
+async def _refresh_page(url: str, cached: CachedPage) -> str:
+    # Stale entry: ask the origin whether it changed instead of re-downloading blindly
+    validators = cached.validators() if cached is not None else None
+    with span("download"):
+        status, headers, html = await asyncio.wait_for(
+            _download(url, validators or None), timeout=HTTP_TIMEOUT_BUDGET
+        )
+
+    if status == 304 and cached is not None:
+        content_cache.revalidated += 1
+        content_cache.touch(cached)
+        return cached.text
+
+    content_cache.misses += 1
+    with span("extract"):
+        text = await extract_text(html) if html else ""
+
+    if 200 <= status < 300:
+        content_cache.put(url, CachedPage(
+            text,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        ))
+    return text
+
+
+async def _hedged(scrape, url: str, hedge_after: float) -> str:
+    """Runs scrape(url); if it is still running after `hedge_after` seconds, races a second attempt."""
+    attempts = {asyncio.ensure_future(scrape(url))}
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=hedge_after if hedge_after > 0 else None)
+        if not done:
+            download_stats.hedged += 1
+            # Otherwise the second attempt would just join the slow in-flight fetch
+            page_flights.forget(canonical_url(url))
+            attempts.add(asyncio.ensure_future(scrape(url)))
+
+        while attempts:
+            done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None and task.result():
+                    return task.result()
+        return ""
+    finally:
+        for task in attempts:
+            task.cancel()
+
+
+def quorum_for(wanted: int) -> int:
+    """Sources to wait for when `wanted` are asked for: SCRAPE_QUORUM if set and lower, else all."""
+    return min(SCRAPE_QUORUM, wanted) if SCRAPE_QUORUM > 0 else wanted
+
+
+async def scrape_quorum(urls: list, scrape, quorum: int = None,
+                        soft_deadline: float = SCRAPE_SOFT_DEADLINE,
+                        hedge_after: float = SCRAPE_HEDGE_AFTER, on_result=None) -> list:
+    """Scrapes URLs concurrently and returns once `quorum` of them have content.
+
+    Also returns once `soft_deadline` has passed with at least one page in hand. Results
+    line up with `urls`; failed pages and cancelled stragglers are None, and at most
+    `quorum` pages (the first to complete) are kept; on_result(index, content) is
+    called as each one arrives.
+    """
+    if quorum is None:
+        quorum = quorum_for(len(urls))
+    loop = asyncio.get_running_loop()
+    tasks = {asyncio.ensure_future(_hedged(scrape, url, hedge_after)): i for i, url in enumerate(urls)}
+    results = [None] * len(urls)
+    successes = 0
+    soft_at = loop.time() + soft_deadline
+    pending = set(tasks)
+    try:
+        while pending and successes < quorum:
+            timeout = None if successes == 0 else max(0.0, soft_at - loop.time())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"Soft deadline reached with {successes}/{quorum} sources; skipping stragglers")
+                break
+            for task in done:
+                if task.cancelled() or task.exception() is not None:
+                    continue
+                content = task.result()
+                if content and successes < quorum:
+                    results[tasks[task]] = content
+                    successes += 1
+                    if on_result is not None:
+                        on_result(tasks[task], content)
+    finally:
+        download_stats.stragglers_cancelled += len(pending)
+        for task in pending:
+            task.cancel()
+    return results
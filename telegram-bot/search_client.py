@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from http_client import get_http_client
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CSE_ENDPOINT = os.getenv("GOOGLE_CSE_ENDPOINT", "https://www.googleapis.com/customsearch/v1")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))  # seconds
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2000"))
+
+
+class SearchError(Exception):
+    pass
+
+
+class SearchClient:
+    """Async Google Custom Search client: REST over the shared pool, TTL cache.
+
+    Identical queries share one in-flight call until it returns (single-flight). CSE has
+    no multi-query endpoint, so distinct queries are sent as they arrive, each taking one
+    slot from the quota limiter.
+    """
+
+    def __init__(self, api_key: str, cse_id: str, limiter=None):
+        self.api_key = api_key
+        self.cse_id = cse_id
+        self.limiter = limiter
+        self.cache = OrderedDict()  # key -> (expires_at, result)
+        self.flights = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    @staticmethod
+    def _key(query: str, num: int, fields: str) -> tuple:
+        return (" ".join(query.lower().split()), num, fields)
+
+    def _cached(self, key: tuple):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if time.monotonic() > expires_at:
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return result
+
+    def _store(self, key: tuple, result: dict):
+        self.cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, result)
+        self.cache.move_to_end(key)
+        while len(self.cache) > SEARCH_CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    async def search(self, query: str, num: int = 5, fields: str = "items(title,link,snippet)") -> dict:
+        """Returns the CSE JSON response for a query (cached for SEARCH_CACHE_TTL)."""
+        key = self._key(query, num, fields)
+        result = self._cached(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        return await self.flights.run(key, lambda: self._fetch(key))
+
+    async def _fetch(self, key: tuple) -> dict:
+        query, num, fields = key
+        params = {"cx": self.cse_id, "q": query, "num": num, "fields": fields}
+        # The key goes in a header: httpx logs request URLs (query string included) at INFO
+        headers = {"X-goog-api-key": self.api_key}
+        if self.limiter is not None:
+            async with self.limiter:
+                response = await get_http_client().get(GOOGLE_CSE_ENDPOINT, params=params, headers=headers)
+        else:
+            response = await get_http_client().get(GOOGLE_CSE_ENDPOINT, params=params, headers=headers)
+        self.api_calls += 1
+        self._feedback(response)
+
+        if response.status_code != 200:
+            raise SearchError(f"Custom Search returned HTTP {response.status_code}: {response.text[:200]}")
+        result = response.json()
+        self._store(key, result)
+        return result
+
+    def _feedback(self, response):
+        """Lets an adaptive limiter slow down on throttling (429, or 403 with a quota reason)."""
+        if self.limiter is None or not hasattr(self.limiter, "on_throttle"):
+            return
+        if response.status_code == 200:
+            self.limiter.on_success()
+        elif response.status_code == 429 or (
+            response.status_code == 403 and ("rateLimitExceeded" in response.text or "quota" in response.text.lower())
+        ):
+            try:
+                retry_after = float(response.headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                retry_after = None
+            self.limiter.on_throttle(retry_after)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "coalesced": self.flights.coalesced,
+            "api_calls": self.api_calls,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,66 @@
+import asyncio
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Deduplicates concurrent identical work: callers with the same key share one in-flight task.
+
+    The task runs on its own, so the first caller going away doesn't cancel it for the
+    others; it is cancelled only once every caller waiting on it has gone. Nothing is
+    kept after the task finishes - caching results is the caller's business.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def run(self, key, factory):
+        """Returns the result of factory() (a coroutine function), shared with concurrent callers of key."""
+        flight = self.flights.get(key)
+        if flight is None or flight.abandoned:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self.flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller has gone away; nobody needs the result
+                flight.abandoned = True
+                self.abandoned += 1
+                flight.task.cancel()
+
+    def forget(self, key):
+        """Lets the next call for key start a new task; the current one keeps serving its callers."""
+        self.flights.pop(key, None)
+
+    def _land(self, key, flight: _Flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if not flight.task.cancelled():
+            # Retrieved even if every caller left, so a failure isn't logged as never retrieved
+            flight.task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self.flights),
+        }
@@ -0,0 +1,166 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from models import Verdict, VERDICT_LABELS
+
+logger = logging.getLogger(__name__)
+
+# Claims ready for analysis within this many seconds of each other share one Gemini request (0 = off)
+VERDICT_BATCH_WAIT = float(os.getenv("VERDICT_BATCH_WAIT", "0"))
+VERDICT_BATCH_MAX = int(os.getenv("VERDICT_BATCH_MAX", "4"))
+
+_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "verdict": {"type": "STRING", "enum": list(VERDICT_LABELS)},
+            "evidence": {"type": "STRING"},
+            "source_summary": {"type": "STRING"},
+            "rhetoric": {"type": "STRING"},
+            "conclusion": {"type": "STRING"},
+        },
+        "required": ["id", "verdict", "evidence", "source_summary", "conclusion"],
+    },
+}
+
+
+class VerdictBatcher:
+    """Micro-batches verdict requests: claims that arrive together get one multi-claim Gemini call.
+
+    The first claim opens a window of max_wait seconds; the batch is sent when the window
+    closes or max_batch claims are waiting. Gemini answers with a JSON array (structured
+    output), one verdict per claim, which is fanned back out to the waiting callers. A
+    claim missing from the answer, or a failed batch, falls back to single(claim, documents).
+    """
+
+    def __init__(self, gemini, model: str, format_sources, single, limiter=None,
+                 max_batch: int = VERDICT_BATCH_MAX, max_wait: float = VERDICT_BATCH_WAIT):
+        self.gemini = gemini
+        self.model = model
+        self.format_sources = format_sources
+        self.single = single
+        self.limiter = limiter
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = []  # (claim, documents, future) for the batch currently being collected
+        self.flush_handle = None
+        self.tasks = set()
+
+        self.batches = 0
+        self.batched_claims = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait > 0 and self.max_batch > 1
+
+    async def submit(self, claim: str, documents: list) -> Verdict:
+        if not self.enabled:
+            return await self.single(claim, documents)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((claim, documents, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_wait, self._flush)
+        # Shield so one cancelled caller doesn't cancel the batch for the others
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        batch, self.pending, self.flush_handle = self.pending, [], None
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._analyze(batch) if len(batch) > 1 else self._fallback(*batch[0]))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def _prompt(self, batch: list) -> str:
+        current_time = datetime.now().strftime("%B %d, %Y")
+        claims = "".join(
+            f"\n##### CLAIM {number}: {claim}\n\nSOURCE CONTENTS:\n{self.format_sources(documents)}\n"
+            for number, (claim, documents, _) in enumerate(batch, 1)
+        )
+        return (
+            f"Current Date: {current_time}\n\n"
+            f"Review the source contents for each of the following {len(batch)} claims and provide a clear "
+            f"analysis of each. Judge every claim ONLY by its own sources.\n"
+            f"{claims}\n"
+            f"INSTRUCTIONS:\n"
+            f"1. Carefully analyze what each source says about the specific claim\n"
+            f"2. Look for concrete evidence, numbers, and verifiable facts\n"
+            f"3. Compare information across sources\n"
+            f"4. Consider the reliability and recency of sources, and any rhetoric issues noted with them\n"
+            f"5. Based SOLELY on the available source content, provide a clear verdict\n\n"
+            f"Answer with one object per claim:\n"
+            f"- id: the claim number\n"
+            f"- verdict: CONFIRMED (multiple reliable sources clearly support the claim), FALSE (multiple "
+            f"reliable sources clearly contradict it), PARTIALLY TRUE (some aspects are true but others are "
+            f"not) or UNVERIFIABLE (ONLY if sources don't provide enough evidence)\n"
+            f"- evidence: 20-30 words as a list of specific facts, numbers, and quotes from sources that support your verdict\n"
+            f"- source_summary: 20 word summary of what each source says\n"
+            f"- rhetoric: briefly note if any sources show problematic language that affects reliability\n"
+            f"- conclusion: 2-3 sentence final assessment that clearly explains your verdict\n\n"
+            f"Be decisive when evidence is clear. Choose UNVERIFIABLE only as a last resort when sources truly don't address the claim."
+        )
+
+    async def _analyze(self, batch: list):
+        self.batches += 1
+        self.batched_claims += len(batch)
+        logger.info(f"Requesting verdicts for {len(batch)} claims in one Gemini call")
+        try:
+            response = await self.gemini.generate(
+                self.model, self._prompt(batch), limiter=self.limiter,
+                config={"response_mime_type": "application/json", "response_schema": _RESPONSE_SCHEMA},
+            )
+            answers = {item["id"]: item for item in json.loads(response.text)}
+        except Exception as e:
+            logger.warning(f"Batched verdict request failed ({e}); analyzing {len(batch)} claims one by one")
+            answers = {}
+
+        fallbacks = []
+        for number, (claim, documents, future) in enumerate(batch, 1):
+            answer = answers.get(number)
+            if answer is None or answer.get("verdict") not in VERDICT_LABELS:
+                fallbacks.append(self._fallback(claim, documents, future))
+                continue
+            if not future.done():
+                future.set_result(Verdict(
+                    claim=claim,
+                    label=answer["verdict"],
+                    evidence=answer.get("evidence", ""),
+                    source_summary=answer.get("source_summary", ""),
+                    rhetoric=answer.get("rhetoric", ""),
+                    conclusion=answer.get("conclusion", ""),
+                    sources=[document.hit for document in documents],
+                ))
+        self.fallbacks += len(fallbacks)
+        await asyncio.gather(*fallbacks)
+
+    async def _fallback(self, claim: str, documents: list, future: asyncio.Future):
+        try:
+            verdict = await self.single(claim, documents)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                # Mark it retrieved in case every caller has gone away
+                future.exception()
+            return
+        if not future.done():
+            future.set_result(verdict)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "batches": self.batches,
+            "batched_claims": self.batched_claims,
+            "claims_per_batch": round(self.batched_claims / self.batches, 2) if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,303 @@
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from models import Verdict
+
+logger = logging.getLogger(__name__)
+
+VERDICT_CACHE_PATH = os.getenv(
+    "VERDICT_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "verdicts.sqlite3")
+)
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", str(6 * 3600)))  # seconds
+VERDICT_CACHE_MEMORY_SIZE = int(os.getenv("VERDICT_CACHE_MEMORY_SIZE", "1000"))
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "20000"))
+# Near-duplicate matching is opt-in: "X is dead" and "X is not dead" look alike to MinHash
+VERDICT_CACHE_NEAR_DUP = os.getenv("VERDICT_CACHE_NEAR_DUP", "0") == "1"
+VERDICT_CACHE_NEAR_DUP_THRESHOLD = float(os.getenv("VERDICT_CACHE_NEAR_DUP_THRESHOLD", "0.85"))
+VERDICT_CACHE_FLUSH_INTERVAL = float(os.getenv("VERDICT_CACHE_FLUSH_INTERVAL", "5"))  # seconds between last_used writes
+
+_READ_TIMEOUT = 0.05  # seconds a lookup may wait on the database lock before counting as a miss
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_claim(claim: str) -> str:
+    """Folds case, punctuation and whitespace so trivially different claims share a key."""
+    text = unicodedata.normalize("NFKC", claim).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class MinHashIndex:
+    """MinHash signatures with LSH banding for near-duplicate claim lookup."""
+
+    PRIME = (1 << 61) - 1
+    MAX_HASH = (1 << 64) - 1
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 4):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Fixed seeds so signatures are stable across restarts
+        seeds = [hashlib.blake2b(f"perm{i}".encode(), digest_size=16).digest() for i in range(num_perm)]
+        self.perms = [
+            (int.from_bytes(s[:8], "big") % self.PRIME | 1, int.from_bytes(s[8:], "big") % self.PRIME)
+            for s in seeds
+        ]
+        self.buckets = {}
+        self.signatures = {}
+
+    def signature(self, key: str) -> tuple:
+        n = self.shingle_size
+        text = f" {key} "
+        shingles = {text[i:i + n] for i in range(max(1, len(text) - n + 1))}
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+        return tuple(
+            min(((a * h + b) % self.PRIME) & self.MAX_HASH for h in hashes)
+            for a, b in self.perms
+        )
+
+    def _bands(self, sig: tuple):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key: str):
+        if key in self.signatures:
+            return
+        sig = self.signature(key)
+        self.signatures[key] = sig
+        for band in self._bands(sig):
+            self.buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key: str):
+        sig = self.signatures.pop(key, None)
+        if sig is None:
+            return
+        for band in self._bands(sig):
+            keys = self.buckets.get(band)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.buckets[band]
+
+    def query(self, key: str, threshold: float):
+        """Returns the indexed key most similar to `key` above `threshold`, or None."""
+        sig = self.signature(key)
+        candidates = set()
+        for band in self._bands(sig):
+            candidates |= self.buckets.get(band, set())
+
+        best, best_score = None, threshold
+        for candidate in candidates:
+            other = self.signatures[candidate]
+            score = sum(x == y for x, y in zip(sig, other)) / self.num_perm
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+
+class VerdictCache:
+    """Claim -> verdict cache: in-memory LRU in front of a SQLite store, with a TTL.
+
+    Lookups only ever read the database (and only on a memory miss). Every write - new
+    verdicts, expiry, eviction and last_used times, which are batched - goes through one
+    writer thread, so a lock held by the other process sharing the file never stalls the
+    caller's event loop.
+    """
+
+    def __init__(self, path: str = VERDICT_CACHE_PATH, ttl: float = VERDICT_CACHE_TTL,
+                 memory_size: int = VERDICT_CACHE_MEMORY_SIZE, max_entries: int = VERDICT_CACHE_MAX_ENTRIES,
+                 near_dup: bool = VERDICT_CACHE_NEAR_DUP):
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.near_dup = MinHashIndex() if near_dup else None
+        self.memory = OrderedDict()  # key -> (verdict, created_at, compute_seconds)
+        self.lock = threading.Lock()
+        self.touched = {}  # key -> last_used not yet written
+        self.writes = queue.Queue()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "key TEXT PRIMARY KEY, verdict TEXT NOT NULL, created_at REAL NOT NULL, "
+            "last_used REAL NOT NULL, compute_seconds REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts(last_used)")
+        self.db.commit()
+        self._warm()
+        # From here on this connection only reads
+        self.db.execute(f"PRAGMA busy_timeout = {int(_READ_TIMEOUT * 1000)}")
+
+        self.writer = threading.Thread(target=self._write_loop, name="verdict-cache-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def _warm(self):
+        """Loads the most recently used, still fresh entries into memory."""
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            self.db.execute("DELETE FROM verdicts WHERE created_at < ?", (cutoff,))
+            self.db.commit()
+            rows = self.db.execute(
+                "SELECT key, verdict, created_at, compute_seconds FROM verdicts "
+                "ORDER BY last_used DESC LIMIT ?", (self.memory_size,)
+            ).fetchall()
+            for key, verdict, created_at, compute_seconds in reversed(rows):
+                self._remember(key, (verdict, created_at, compute_seconds))
+        logger.info(f"Verdict cache loaded {len(rows)} entries from {self.path}")
+
+    def _remember(self, key: str, entry: tuple):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        if self.near_dup is not None:
+            self.near_dup.add(key)
+        while len(self.memory) > self.memory_size:
+            old_key, _ = self.memory.popitem(last=False)
+            if self.near_dup is not None:
+                self.near_dup.remove(old_key)
+
+    def _forget(self, key: str):
+        self.memory.pop(key, None)
+        self.touched.pop(key, None)
+        if self.near_dup is not None:
+            self.near_dup.remove(key)
+        self.writes.put(("delete", key))
+
+    def _lookup(self, key: str):
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is None:
+            try:
+                row = self.db.execute(
+                    "SELECT verdict, created_at, compute_seconds FROM verdicts WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Verdict cache read failed ({e}); treating as a miss")
+                return None
+            if row is None:
+                return None
+            entry = tuple(row)
+
+        if now - entry[1] > self.ttl:
+            self._forget(key)
+            return None
+
+        self._remember(key, entry)
+        self.touched[key] = now
+        return entry
+
+    def get(self, claim: str):
+        """Returns the cached verdict for a claim (or a near-duplicate of it), else None."""
+        key = normalize_claim(claim)
+        with self.lock:
+            entry = self._lookup(key)
+            if entry is None and self.near_dup is not None:
+                similar = self.near_dup.query(key, VERDICT_CACHE_NEAR_DUP_THRESHOLD)
+                if similar is not None:
+                    entry = self._lookup(similar)
+                    if entry is not None:
+                        self.near_hits += 1
+            elif entry is not None:
+                self.hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self.seconds_saved += entry[2]
+        try:
+            return Verdict.from_dict(json.loads(entry[0]))
+        except (ValueError, TypeError):
+            # Written by an older version that stored rendered text
+            return None
+
+    def put(self, claim: str, verdict: Verdict, compute_seconds: float = 0.0):
+        """Stores a verdict along with how long it took to produce."""
+        key = normalize_claim(claim)
+        now = time.time()
+        verdict = json.dumps(verdict.to_dict())
+        with self.lock:
+            self._remember(key, (verdict, now, compute_seconds))
+            self.touched.pop(key, None)
+        self.writes.put(("put", key, verdict, now, compute_seconds))
+
+    def _write_loop(self):
+        """Writer thread: applies queued writes in batches, plus last_used times every flush interval."""
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous=NORMAL")
+        running = True
+        while running:
+            try:
+                batch = [self.writes.get(timeout=VERDICT_CACHE_FLUSH_INTERVAL)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self.writes.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+            with self.lock:
+                touched, self.touched = self.touched, {}
+            try:
+                self._write(db, [item for item in batch if item is not None], touched)
+            except sqlite3.Error as e:
+                logger.warning(f"Verdict cache write failed: {e}")
+        db.close()
+
+    def _write(self, db, batch: list, touched: dict):
+        if not batch and not touched:
+            return
+        puts = [item[1:] for item in batch if item[0] == "put"]
+        db.executemany(
+            "INSERT OR REPLACE INTO verdicts (key, verdict, created_at, last_used, compute_seconds) "
+            "VALUES (?, ?, ?, ?, ?)", [(key, verdict, now, now, seconds) for key, verdict, now, seconds in puts]
+        )
+        db.executemany("DELETE FROM verdicts WHERE key = ?", [(item[1],) for item in batch if item[0] == "delete"])
+        db.executemany("UPDATE verdicts SET last_used = ? WHERE key = ?", [(t, key) for key, t in touched.items()])
+        if puts:
+            # LRU eviction on disk
+            db.execute(
+                "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+        db.commit()
+
+    def close(self):
+        """Writes out everything pending; the cache stays readable from memory afterwards."""
+        if self.writer.is_alive():
+            self.writes.put(None)
+            self.writer.join()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "hits": self.hits,
+            "near_duplicate_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+            "latency_saved_seconds": round(self.seconds_saved, 2),
+            "memory_entries": len(self.memory),
+        }
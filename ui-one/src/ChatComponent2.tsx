@@ -11,17 +11,106 @@ interface ChatComponentProps {
   recentSearches: string[]
 }
 
+type StreamData = { stage?: string; done?: number; total?: number; text?: string; analysis?: string; error?: string }
+type StreamEvent = { event: string; data: StreamData }
+
+const API_URL = "http://localhost:5000"
+
+// The server reported a failure over the stream: the analysis already ran, so it isn't retried
+class StreamError extends Error {}
+
+// Parses one Server-Sent Events block ("event: x\ndata: {...}")
+const parseEvent = (raw: string): StreamEvent | null => {
+  let event = "message"
+  let data = ""
+  for (const line of raw.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim()
+    else if (line.startsWith("data:")) data += line.slice(5).trim()
+  }
+  return data ? { event, data: JSON.parse(data) } : null
+}
+
+const describeProgress = (data: StreamData) => {
+  switch (data.stage) {
+    case "searching":
+      return "Searching trusted sources..."
+    case "scraping":
+      return `Reading ${data.total} sources...`
+    case "scraped":
+      return `Scraped ${data.done}/${data.total} sources...`
+    case "analyzing":
+      return "Analyzing the evidence..."
+    default:
+      return "Analyzing your request..."
+  }
+}
+
 export function ChatComponent2({ setRecentSearches, recentSearches }: ChatComponentProps) {
   const [messages, setMessages] = useState<{ text: string; sender: "user" | "checker"; timestamp: Date }[]>([])
   const [inputValue, setInputValue] = useState<string>("")
   const [loading, setLoading] = useState<boolean>(false)
+  const [status, setStatus] = useState<string>("Analyzing your request...")
   const messagesEndRef = useRef<HTMLDivElement>(null)
+  // Whether the current answer has a checker message on screen that later text should replace
+  const streamingRef = useRef<boolean>(false)
 
   // Auto-scroll to bottom when messages change
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" })
   }, [messages])
 
+  // Appends a new checker message, or replaces the text of the one being streamed
+  const upsertCheckerMessage = (text: string, replace: boolean) => {
+    setMessages((prev) => {
+      if (replace && prev.length && prev[prev.length - 1].sender === "checker") {
+        return [...prev.slice(0, -1), { ...prev[prev.length - 1], text }]
+      }
+      return [...prev, { text, sender: "checker", timestamp: new Date() }]
+    })
+  }
+
+  // Streams progress and the verdict from /api/analyze/stream
+  const streamAnalysis = async (claim: string) => {
+    const response = await fetch(`${API_URL}/api/analyze/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ claim }),
+    })
+    if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`)
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ""
+    let streamed = ""
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const blocks = buffer.split("\n\n")
+      buffer = blocks.pop() ?? ""
+
+      for (const block of blocks) {
+        const parsed = parseEvent(block)
+        if (!parsed) continue
+        if (parsed.event === "progress") {
+          setStatus(describeProgress(parsed.data))
+        } else if (parsed.event === "token") {
+          streamed += parsed.data.text ?? ""
+          upsertCheckerMessage(streamed, streamingRef.current)
+          streamingRef.current = true
+          setLoading(false)
+        } else if (parsed.event === "done") {
+          upsertCheckerMessage(parsed.data.analysis ?? streamed, streamingRef.current)
+          streamingRef.current = true
+        } else if (parsed.event === "error") {
+          throw new StreamError(parsed.data.error)
+        }
+      }
+    }
+    if (!streamingRef.current) throw new Error("Stream ended without a verdict")
+  }
+
   const handleSubmit = async (event: React.FormEvent) => {
     event.preventDefault()
     if (inputValue.trim()) {
@@ -29,31 +118,29 @@ export function ChatComponent2({ setRecentSearches, recentSearches }: ChatCompon
       setMessages((prev) => [...prev, { text: inputValue, sender: "user", timestamp: new Date() }])
       setRecentSearches((prev) => [inputValue, ...prev.slice(0, 4)]) // Keep only 5 recent searches
       setInputValue("") // Clear the input after submission
+      setStatus("Analyzing your request...")
       setLoading(true) // Start loading
+      streamingRef.current = false
 
       try {
-        // Send the input value to the backend
-        const response = await axios.post("http://localhost:5000/api/analyze", { claim: inputValue })
-        const checkerResponse = response.data.analysis // Get the analysis from the response
-
-        // Simulate a slight delay for a more natural conversation flow
-        setTimeout(() => {
-          setMessages((prev) => [...prev, { text: checkerResponse, sender: "checker", timestamp: new Date() }])
-          setLoading(false)
-        }, 500)
+        await streamAnalysis(inputValue)
+        setLoading(false)
       } catch (error) {
-        console.error("Error sending message to backend:", error)
-        setTimeout(() => {
-          setMessages((prev) => [
-            ...prev,
-            {
-              text: "Sorry, I couldn't process your request. Please try again later.",
-              sender: "checker",
-              timestamp: new Date(),
-            },
-          ])
-          setLoading(false)
-        }, 500)
+        console.error("Error streaming analysis from backend:", error)
+        // Any partially streamed answer is replaced, not left above the final one
+        if (error instanceof StreamError) {
+          upsertCheckerMessage("Sorry, I couldn't process your request. Please try again later.", streamingRef.current)
+        } else {
+          try {
+            // The stream itself failed (connection, proxy): fall back to the non-streaming endpoint
+            const response = await axios.post(`${API_URL}/api/analyze`, { claim: inputValue })
+            upsertCheckerMessage(response.data.analysis, streamingRef.current)
+          } catch (fallbackError) {
+            console.error("Error sending message to backend:", fallbackError)
+            upsertCheckerMessage("Sorry, I couldn't process your request. Please try again later.", streamingRef.current)
+          }
+        }
+        setLoading(false)
       }
     }
   }
@@ -163,7 +250,7 @@ export function ChatComponent2({ setRecentSearches, recentSearches }: ChatCompon
                 <div className="p-3 rounded-2xl bg-gradient-to-r from-gray-900/90 to-indigo-900/90 text-gray-100 rounded-tl-none border border-indigo-500/30">
                   <div className="flex items-center space-x-2">
                     <RefreshCw className="h-4 w-4 animate-spin text-indigo-300" />
-                    <span>Analyzing your request...</span>
+                    <span>{status}</span>
                   </div>
                 </div>
               </div>